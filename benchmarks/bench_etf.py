@@ -0,0 +1,130 @@
+"""Compares decoding gateway traffic encoded as ETF against the JSON
+path, including the Snowflake conversion every id goes through.
+
+    python benchmarks/bench_etf.py [recording.jsonl]
+
+A recording is one gateway payload per line, as received with
+encoding=json. Without one, GUILD_CREATE and MESSAGE_CREATE payloads
+are built from a seeded `FakeDiscordModel`.
+"""
+import os
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from snekcord.fakerest import FakeDiscordModel  # noqa: E402
+from snekcord.utils import (Snowflake, etf_dumps, etf_loads,  # noqa: E402
+                            get_json_codec, json_dumps, json_loads)
+
+SEED = 0
+GUILDS = 5
+MEMBERS = 1000
+MESSAGES = 500
+ROUNDS = 5
+
+
+def _is_id(key):
+    return key == 'id' or key.endswith('_id') or key == 'roles'
+
+
+def to_etf_term(obj, is_id=False):
+    # Discord sends snowflakes as integers over ETF
+    if isinstance(obj, dict):
+        return {key: to_etf_term(value, _is_id(key))
+                for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [to_etf_term(value, is_id) for value in obj]
+    if is_id and isinstance(obj, str) and obj.isdigit():
+        return int(obj)
+    return obj
+
+
+def convert_ids(obj, is_id=False):
+    # What the JsonFields of the objects would do with every id
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            convert_ids(value, _is_id(key))
+    elif isinstance(obj, list):
+        for value in obj:
+            convert_ids(value, is_id)
+    elif is_id and obj is not None:
+        Snowflake(obj)
+
+
+def generate_traffic():
+    model = FakeDiscordModel(SEED, guilds=GUILDS, channels=2,
+                             members=MEMBERS, messages=MESSAGES)
+    payloads = []
+    sequence = 0
+
+    for guild_id, guild in model.guilds.items():
+        sequence += 1
+        payloads.append({'op': 0, 's': sequence, 't': 'GUILD_CREATE', 'd': {
+            **guild,
+            'roles': list(model.roles[guild_id].values()),
+            'members': list(model.members[guild_id].values()),
+            'channels': [channel for channel in model.channels.values()
+                         if channel.get('guild_id') == guild_id],
+        }})
+
+    for messages in model.messages.values():
+        for message in messages.values():
+            sequence += 1
+            payloads.append({'op': 0, 's': sequence, 't': 'MESSAGE_CREATE',
+                             'd': message})
+
+    return payloads
+
+
+def load_traffic(path):
+    with open(path, 'rb') as fp:
+        return [json_loads(line) for line in fp if line.strip()]
+
+
+def bench(frames, decode):
+    best = float('inf')
+
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        for frame in frames:
+            convert_ids(decode(frame))
+        best = min(best, time.perf_counter() - started)
+
+    return best
+
+
+def compressed_size(frames):
+    compressor = zlib.compressobj()
+    return sum(len(compressor.compress(frame)
+                   + compressor.flush(zlib.Z_SYNC_FLUSH))
+               for frame in frames)
+
+
+def main():
+    if len(sys.argv) > 1:
+        payloads = load_traffic(sys.argv[1])
+    else:
+        payloads = generate_traffic()
+
+    encodings = (
+        (f'json ({get_json_codec().name})',
+         [json_dumps(payload) for payload in payloads], json_loads),
+        ('etf', [etf_dumps(to_etf_term(payload)) for payload in payloads],
+         etf_loads),
+    )
+
+    print(f'{len(payloads)} payloads, best of {ROUNDS}')
+
+    for name, frames, decode in encodings:
+        elapsed = bench(frames, decode)
+        size = sum(len(frame) for frame in frames)
+        print(f'{name:>16}: {elapsed * 1000:8.1f}ms '
+              f'{len(frames) / elapsed:10.0f} payloads/s '
+              f'{size / 1024:8.0f}KiB raw '
+              f'{compressed_size(frames) / 1024:6.0f}KiB zlib-stream')
+
+
+if __name__ == '__main__':
+    main()
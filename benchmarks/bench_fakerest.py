@@ -0,0 +1,80 @@
+"""Measures end-to-end throughput of the state fetch paths against
+the offline `FakeDiscordTransport`, rate limits included, so the
+numbers are repeatable on a machine with no network.
+
+    python benchmarks/bench_fakerest.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import snekcord  # noqa: E402
+from snekcord import rest  # noqa: E402
+from snekcord.fakerest import (FakeDiscordModel,  # noqa: E402
+                               FakeDiscordTransport)
+
+SEED = 0
+LATENCY = 0.02
+JITTER = 0.01
+MEMBERS = 5000
+MESSAGES = 2000
+
+
+async def bench_history(manager, channel_id):
+    channel = manager.channels.upsert(await rest.get_channel.request(
+        session=manager.rest, fmt=dict(channel_id=channel_id)))
+
+    count = 0
+    async for _ in channel.messages.history():
+        count += 1
+    return count
+
+
+async def bench_members(manager, guild_id):
+    guild = manager.guilds.upsert(await rest.get_guild.request(
+        session=manager.rest, fmt=dict(guild_id=guild_id)))
+
+    count = 0
+    async for _ in guild.members.fetch_all():
+        count += 1
+    return count
+
+
+async def main():
+    model = FakeDiscordModel(SEED, guilds=1, channels=1, members=MEMBERS,
+                             messages=MESSAGES)
+    transport = FakeDiscordTransport(model, seed=SEED, latency=LATENCY,
+                                     jitter=JITTER)
+
+    manager = snekcord.BaseManager('Bot token',
+                                   loop=asyncio.get_running_loop())
+    manager.rest = rest.RestSession(manager, transport=transport)
+
+    guild_id = next(iter(model.guilds))
+    channel_id = next(iter(model.channels))
+
+    benchmarks = (
+        ('history', bench_history(manager, channel_id)),
+        ('members', bench_members(manager, guild_id)),
+    )
+
+    for name, coro in benchmarks:
+        requests = transport.requests
+        started = time.perf_counter()
+        count = await coro
+        elapsed = time.perf_counter() - started
+
+        print(f'{name:>8}: {count:6d} objects in {elapsed:6.2f}s, '
+              f'{count / elapsed:8.0f} objects/s, '
+              f'{transport.requests - requests:4d} requests')
+
+    print(f'{transport.ratelimited} requests were rate limited')
+
+    await manager.rest.aclose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+"""Compares RestSession over HTTP/1.1 and HTTP/2 against a local
+stand-in server, reporting how many connections each mode opened
+and the latency of a burst of concurrent requests.
+
+Requires hypercorn and h2 (pip install hypercorn h2)
+
+    python benchmarks/bench_http2.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from hypercorn.asyncio import serve  # noqa: E402
+from hypercorn.config import Config  # noqa: E402
+
+import snekcord  # noqa: E402
+from snekcord.ratelimit import GlobalRateLimit, RateLimiter  # noqa: E402
+
+HOST = '127.0.0.1'
+PORT = 8765
+BURST = 500
+ROUNDS = 5
+SERVER_LATENCY = 0.005
+
+connections = set()
+
+
+async def app(scope, receive, send):
+    if scope['type'] != 'http':
+        return
+
+    connections.add(tuple(scope['client']))
+    await asyncio.sleep(SERVER_LATENCY)
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({'type': 'http.response.body', 'body': b'{"url": "wss://"}'})
+
+
+async def run(manager, **options):
+    connections.clear()
+
+    # The stand-in server has no global rate limit to respect
+    ratelimiter = RateLimiter(GlobalRateLimit(rate=1e9))
+
+    session = snekcord.BaseManager.get_class('RestSession')(
+        manager=manager, ratelimiter=ratelimiter, coalesce_requests=False,
+        **options)
+    url = f'http://{HOST}:{PORT}/api/v9/gateway'
+
+    async def timed():
+        started = time.perf_counter()
+        await session.request('GET', url)
+        return time.perf_counter() - started
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        latencies += await asyncio.gather(*(timed() for _ in range(BURST)))
+    elapsed = time.perf_counter() - started
+
+    await session.aclose()
+
+    latencies.sort()
+    return {
+        'connections': len(connections),
+        'p50': statistics.median(latencies) * 1000,
+        'p99': latencies[int(len(latencies) * 0.99)] * 1000,
+        'total': elapsed,
+    }
+
+
+async def main():
+    config = Config()
+    config.bind = [f'{HOST}:{PORT}']
+    config.loglevel = 'WARNING'
+    config.keep_alive_max_requests = BURST * ROUNDS * 2
+
+    shutdown = asyncio.Event()
+    server = asyncio.ensure_future(
+        serve(app, config, shutdown_trigger=shutdown.wait))
+    await asyncio.sleep(0.5)
+
+    manager = snekcord.BaseManager('Bot token',
+                                   loop=asyncio.get_running_loop())
+
+    modes = (
+        ('HTTP/1.1', {}),
+        ('HTTP/2', {'http1': False, 'http2': True}),
+    )
+
+    for name, options in modes:
+        result = await run(manager, **options)
+        print(f'{name:>8}: {result["connections"]:4d} connections, '
+              f'p50 {result["p50"]:7.2f}ms, p99 {result["p99"]:7.2f}ms, '
+              f'{BURST * ROUNDS / result["total"]:8.0f} req/s')
+
+    shutdown.set()
+    await server
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
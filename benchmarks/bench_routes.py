@@ -0,0 +1,85 @@
+"""Measures the per-call overhead of `HTTPEndpoint.request`, without
+any I/O, before and after endpoints were compiled into `HTTPRoute`s.
+
+    python benchmarks/bench_routes.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from snekcord import rest  # noqa: E402
+
+NUMBER = 200000
+
+
+class DummySession:
+    def __init__(self):
+        self.global_headers = {'Authorization': 'Bot token'}
+        self.global_fmt = {'version': 'v9'}
+        self.routes = {}
+        self.response_cache = None
+
+    compile_route = rest.RestSession.compile_route
+
+    def request(self, method, url, **kwargs):
+        return url
+
+
+class LegacyEndpoint:
+    """`HTTPEndpoint` as it was before routes were compiled, its key
+    tuples are built once like the old constructor did"""
+
+    def __init__(self, endpoint):
+        self.method = endpoint.method
+        self.url = endpoint.url
+        self.params = tuple(endpoint.params)
+        self.json = tuple(endpoint.json)
+        self.array = endpoint.array
+
+    def request(self, *, session, params=None, json=None, fast=False,
+                **kwargs):
+        if not fast:
+            if params is not None:
+                params = {k: v for k, v in params.items() if k in self.params}
+
+            if json is not None:
+                if self.array:
+                    json = [{k: v for k, v in i.items() if k in self.json}
+                            for i in json]
+                else:
+                    json = {k: v for k, v in json.items() if k in self.json}
+
+        headers = kwargs.setdefault('headers', {})
+        headers.update(session.global_headers)
+
+        fmt = kwargs.pop('fmt', {})
+        fmt.update(session.global_fmt)
+
+        url = self.url % fmt
+        return session.request(self.method, url, params=params, json=json,
+                               **kwargs)
+
+
+def main():
+    session = DummySession()
+    endpoint = rest.create_channel_message
+    legacy = LegacyEndpoint(endpoint)
+    json = {'content': 'Hello', 'tts': False}
+
+    def before():
+        legacy.request(session=session,
+                       fmt=dict(channel_id=123456789), json=json)
+
+    def after():
+        endpoint.request(session=session,
+                         fmt=dict(channel_id=123456789), json=json)
+
+    for name, func in (('before', before), ('after', after)):
+        elapsed = min(timeit.repeat(func, number=NUMBER, repeat=5))
+        print(f'{name:>6}: {elapsed / NUMBER * 1e9:8.1f} ns/call')
+
+
+if __name__ == '__main__':
+    main()
@@ -10,4 +10,8 @@ setuptools.setup(
         'wsaio',
         'snekcord-emojis',
     ],
+    extras_require={
+        'http2': ['h2'],
+        'speed': ['orjson', 'brotli'],
+    },
 )
@@ -0,0 +1,170 @@
+import collections
+import enum
+import time
+
+from .exceptions import RestError
+
+__all__ = ('CircuitState', 'CircuitOpenError', 'CircuitBreaker',
+           'CircuitBreakers')
+
+
+class CircuitState(enum.Enum):
+    """The states of a `CircuitBreaker`
+
+    | Name        | Description                                       |
+    | ----------- | ------------------------------------------------- |
+    | `CLOSED`    | Requests are sent and their outcomes are recorded |
+    | `OPEN`      | Requests fail immediately with `CircuitOpenError` |
+    | `HALF_OPEN` | A few probe requests decide whether to close      |
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(RestError):
+    def __init__(self, msg, route, retry_after):
+        super().__init__(msg)
+        self.route = route
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, route, *, error_rate, min_requests, window,
+                 reset_timeout, probes, listener=None):
+        self.route = route
+        self.error_rate = error_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.probes = probes
+        self.listener = listener
+
+        self.state = CircuitState.CLOSED
+        self.opened_at = None
+
+        self._outcomes = collections.deque()
+        self._failures = 0
+        self._probing = 0
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(route={self.route!r}, '
+                f'state={self.state})')
+
+    def _set_state(self, state):
+        previous = self.state
+        self.state = state
+
+        if state is CircuitState.OPEN:
+            self.opened_at = time.monotonic()
+
+        if self.listener is not None:
+            self.listener(self, previous)
+
+    def _prune(self, now):
+        outcomes = self._outcomes
+        while outcomes and outcomes[0][0] < now - self.window:
+            if outcomes.popleft()[1]:
+                self._failures -= 1
+
+    def allow(self):
+        """Returns whether the request is a probe,
+        raises `CircuitOpenError` if it may not be sent"""
+        if self.state is CircuitState.CLOSED:
+            return False
+
+        if self.state is CircuitState.OPEN:
+            retry_after = self.opened_at + self.reset_timeout \
+                - time.monotonic()
+            if retry_after > 0:
+                raise CircuitOpenError(
+                    f'The circuit for {self.route} is open',
+                    self.route, retry_after)
+
+            self._set_state(CircuitState.HALF_OPEN)
+
+        if self._probing >= self.probes:
+            raise CircuitOpenError(
+                f'The circuit for {self.route} is being probed',
+                self.route, 0.0)
+
+        self._probing += 1
+        return True
+
+    def cancel(self, probe):
+        # The request ended without an outcome, e.g. it was cancelled
+        if probe:
+            self._probing -= 1
+
+    def record(self, failed, probe=False):
+        if probe:
+            self._probing -= 1
+
+            if self.state is CircuitState.HALF_OPEN:
+                if failed:
+                    self._set_state(CircuitState.OPEN)
+                else:
+                    self._outcomes.clear()
+                    self._failures = 0
+                    self._set_state(CircuitState.CLOSED)
+            return
+
+        if self.state is not CircuitState.CLOSED:
+            # A straggler from before the circuit opened
+            return
+
+        now = time.monotonic()
+        self._prune(now)
+
+        self._outcomes.append((now, failed))
+        if failed:
+            self._failures += 1
+
+        total = len(self._outcomes)
+        if (failed and total >= self.min_requests
+                and self._failures / total >= self.error_rate):
+            self._set_state(CircuitState.OPEN)
+
+
+class CircuitBreakers:
+    """Per-route circuit breakers for a `RestSession`, a route's circuit
+    opens when too many of its recent requests failed with a server
+    error or a transport error, and requests to it then fail fast
+    until a probe request succeeds
+
+    Arguments:
+        error_rate float: The fraction of failed requests that opens
+            the circuit
+
+        min_requests int: The minimum number of requests in the window
+            before the circuit can open
+
+        window float: The number of seconds outcomes are counted for
+
+        reset_timeout float: The number of seconds the circuit stays
+            open before it lets probe requests through
+
+        probes int: The number of probe requests allowed at once
+    """
+
+    def __init__(self, error_rate=0.5, min_requests=10, window=30.0,
+                 reset_timeout=10.0, probes=1):
+        self.error_rate = error_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.probes = probes
+
+        self.listener = None
+        self.breakers = {}
+
+    def get(self, route):
+        breaker = self.breakers.get(route)
+        if breaker is None:
+            breaker = self.breakers[route] = CircuitBreaker(
+                route, error_rate=self.error_rate,
+                min_requests=self.min_requests, window=self.window,
+                reset_timeout=self.reset_timeout, probes=self.probes,
+                listener=self.listener)
+
+        return breaker
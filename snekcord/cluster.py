@@ -0,0 +1,382 @@
+import asyncio
+import itertools
+import multiprocessing
+import os
+import time
+
+from .sharder import IDENTIFY_INTERVAL, IdentifyLimiter
+from .utils import (EventDispatcher, _remove_stale_socket, json_dumps,
+                    json_loads)
+
+__all__ = ('ClusterError', 'shard_for_guild', 'ClusterIdentifyLimiter',
+           'ClusterCoordinator', 'ClusterClient', 'run_cluster')
+
+
+class ClusterError(Exception):
+    pass
+
+
+def shard_for_guild(guild_id, shard_count):
+    return (int(guild_id) >> 22) % shard_count
+
+
+def _write(writer, message):
+    writer.write(json_dumps(message) + b'\n')
+
+
+class ClusterIdentifyLimiter(IdentifyLimiter):
+    """An `IdentifyLimiter` whose buckets are shared by every worker
+    connected to the same `ClusterCoordinator`"""
+
+    def __init__(self, client, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.client = client
+
+    async def acquire(self, shard_id):
+        await self.client.request({
+            'op': 'identify',
+            'shard_id': shard_id,
+            'max_concurrency': self.max_concurrency,
+            'remaining': self.remaining,
+            'reset_after': max(self.reset_at - time.monotonic(), 0),
+            'total': self.total,
+            'interval': self.interval,
+        })
+
+
+class ClusterCoordinator:
+    """A Unix socket server that connects the workers of a cluster,
+    it keeps the table of which worker runs which shards, forwards
+    events and queries between workers and spaces out every worker's
+    IDENTIFYs"""
+
+    def __init__(self, path):
+        self.path = path
+        self.server = None
+        self.shard_count = None
+        self.identify_limiter = None
+
+        self.workers = {}
+        self._writers = set()
+
+    def _table(self):
+        return {
+            'op': 'table',
+            'shard_count': self.shard_count,
+            'shards': {str(worker_id): shard_ids
+                       for worker_id, (shard_ids, _) in self.workers.items()},
+        }
+
+    def _broadcast(self, message, exclude=None):
+        for worker_id, (_, writer) in self.workers.items():
+            if worker_id != exclude:
+                _write(writer, message)
+
+    async def _identify(self, writer, message):
+        if self.identify_limiter is None:
+            self.identify_limiter = IdentifyLimiter(
+                message['max_concurrency'],
+                remaining=message.get('remaining'),
+                reset_after=message.get('reset_after', 0.0),
+                total=message.get('total'),
+                interval=message.get('interval', IDENTIFY_INTERVAL))
+
+        await self.identify_limiter.acquire(message['shard_id'])
+        _write(writer, {'op': 'reply', 'nonce': message['nonce']})
+
+    def _route(self, worker_id, writer, message):
+        target = self.workers.get(message['worker_id'])
+
+        if target is None:
+            _write(writer, {
+                'op': 'reply',
+                'nonce': message['nonce'],
+                'error': f'Unknown worker {message["worker_id"]!r}',
+            })
+        else:
+            _write(target[1], dict(message, origin=worker_id))
+
+    async def _handle(self, reader, writer):
+        worker_id = None
+        tasks = []
+        self._writers.add(writer)
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                message = json_loads(line)
+                op = message['op']
+
+                if op == 'register':
+                    worker_id = message['worker_id']
+                    self.shard_count = message['shard_count']
+                    self.workers[worker_id] = (message['shard_ids'], writer)
+                    self._broadcast(self._table())
+                elif op == 'publish':
+                    self._broadcast(dict(message, origin=worker_id),
+                                    exclude=worker_id)
+                elif op == 'identify':
+                    tasks.append(asyncio.ensure_future(
+                        self._identify(writer, message)))
+                elif op == 'query':
+                    self._route(worker_id, writer, message)
+                elif op == 'reply':
+                    target = self.workers.get(message['origin'])
+                    if target is not None:
+                        _write(target[1], message)
+        except (ConnectionError, ValueError, KeyError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+
+            if self.workers.get(worker_id, (None, None))[1] is writer:
+                del self.workers[worker_id]
+                self._broadcast(self._table())
+
+            self._writers.discard(writer)
+            writer.close()
+
+    async def start(self):
+        _remove_stale_socket(self.path)
+        self.server = await asyncio.start_unix_server(self._handle, self.path)
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.server is None:
+            return
+
+        self.server.close()
+
+        # wait_closed() also waits for the connected workers
+        for writer in tuple(self._writers):
+            writer.close()
+
+        await self.server.wait_closed()
+        self.server = None
+
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class ClusterClient(EventDispatcher):
+    """A worker's connection to a `ClusterCoordinator`, events
+    published by other workers are dispatched as `cluster_<name>`
+    with the publishing worker's id and the event's data
+
+    Arguments:
+        path str: The coordinator's socket
+
+        worker_id int: This worker's id, unique within the cluster
+
+        shard_ids list[int]: The shards this worker runs
+
+        shard_count int: The total number of shards in the cluster
+    """
+
+    def __init__(self, path, worker_id, shard_ids, shard_count, *,
+                 loop=None):
+        super().__init__(loop=loop)
+        self.path = path
+        self.worker_id = worker_id
+        self.shard_ids = list(shard_ids)
+        self.shard_count = shard_count
+
+        self.shards = {}
+        self.queries = {}
+
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+        self._nonces = itertools.count()
+        self._pending = {}
+
+    async def connect(self):
+        self._reader, self._writer = \
+            await asyncio.open_unix_connection(self.path)
+        self._read_task = asyncio.ensure_future(self._read_loop())
+
+        _write(self._writer, {
+            'op': 'register',
+            'worker_id': self.worker_id,
+            'shard_ids': self.shard_ids,
+            'shard_count': self.shard_count,
+        })
+
+    async def _answer(self, message):
+        reply = {
+            'op': 'reply',
+            'nonce': message['nonce'],
+            'origin': message['origin'],
+        }
+
+        handler = self.queries.get(message['query'])
+        if handler is None:
+            reply['error'] = f'Unknown query {message["query"]!r}'
+        else:
+            try:
+                result = handler(message.get('data'))
+                if asyncio.iscoroutine(result):
+                    result = await result
+                reply['data'] = result
+            except Exception as exc:
+                reply['error'] = repr(exc)
+
+        if self._writer is not None:
+            _write(self._writer, reply)
+
+    async def _read_loop(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+
+                message = json_loads(line)
+                op = message['op']
+
+                if op == 'table':
+                    self.shard_count = message['shard_count']
+                    self.shards = {
+                        shard_id: int(worker_id)
+                        for worker_id, shard_ids in message['shards'].items()
+                        for shard_id in shard_ids
+                    }
+                elif op == 'publish':
+                    self.dispatch(f'cluster_{message["name"]}',
+                                  message['origin'], message.get('data'))
+                elif op == 'query':
+                    asyncio.ensure_future(self._answer(message))
+                elif op == 'reply':
+                    waiter = self._pending.pop(message['nonce'], None)
+                    if waiter is not None and not waiter.done():
+                        if 'error' in message:
+                            waiter.set_exception(
+                                ClusterError(message['error']))
+                        else:
+                            waiter.set_result(message.get('data'))
+        finally:
+            self._writer = None
+
+            for waiter in self._pending.values():
+                if not waiter.done():
+                    waiter.set_exception(ConnectionResetError())
+
+            self._pending.clear()
+
+    async def request(self, message, timeout=None):
+        if self._writer is None:
+            raise ConnectionResetError
+
+        nonce = next(self._nonces)
+        waiter = self._pending[nonce] = self.loop.create_future()
+        _write(self._writer, dict(message, nonce=nonce))
+
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        finally:
+            self._pending.pop(nonce, None)
+
+    def publish(self, name, data=None):
+        if self._writer is not None:
+            _write(self._writer, {'op': 'publish', 'name': name,
+                                  'data': data})
+
+    def forward(self, dispatcher, *names):
+        """Publishes every `name` event dispatched by `dispatcher`,
+        meant for the raw gateway events a `Sharder` dispatches"""
+        for name in names:
+            # Listeners are registered under lowercased names
+            name = name.lower()
+
+            def callback(shard, data, name=name):
+                self.publish(name, data)
+
+            dispatcher.register_listener(name, callback)
+
+    def register_query(self, name, handler):
+        self.queries[name] = handler
+
+    def owner_of(self, guild_id):
+        # The id of the worker running the guild's shard, None
+        # if that worker isn't connected
+        return self.shards.get(shard_for_guild(guild_id, self.shard_count))
+
+    async def query(self, worker_id, name, data=None, timeout=10.0):
+        return await self.request({'op': 'query', 'worker_id': worker_id,
+                                   'query': name, 'data': data}, timeout)
+
+    async def query_guild(self, guild_id, name, data=None, timeout=10.0):
+        worker_id = self.owner_of(guild_id)
+        if worker_id is None:
+            raise ClusterError(f'No worker owns guild {guild_id}')
+
+        return await self.query(worker_id, name, data, timeout)
+
+    def create_identify_limiter(self, *args, **kwargs):
+        return ClusterIdentifyLimiter(self, *args, **kwargs)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+        if self._read_task is not None:
+            await asyncio.gather(self._read_task, return_exceptions=True)
+
+
+def _run_coordinator(path, ready):
+    async def serve():
+        coordinator = ClusterCoordinator(path)
+        await coordinator.start()
+        ready.set()
+        await coordinator.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+def run_cluster(target, *, path, workers, shard_count, args=()):
+    """Runs a `ClusterCoordinator` and `workers` processes that each call
+    `target(worker_id, shard_ids, shard_count, path, *args)`, shards are
+    split into contiguous ranges. Blocks until every worker exits"""
+    ready = multiprocessing.Event()
+    coordinator = multiprocessing.Process(
+        target=_run_coordinator, args=(path, ready), daemon=True)
+    coordinator.start()
+    ready.wait()
+
+    processes = []
+    per_worker, extra = divmod(shard_count, workers)
+    start = 0
+
+    for worker_id in range(workers):
+        stop = start + per_worker + (worker_id < extra)
+        process = multiprocessing.Process(
+            target=target,
+            args=(worker_id, list(range(start, stop)), shard_count, path,
+                  *args))
+        process.start()
+        processes.append(process)
+        start = stop
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+    finally:
+        coordinator.terminate()
@@ -1,2 +1,7 @@
 class PartialObjectError(TypeError):
     pass
+
+
+class RestError(Exception):
+    """The base of every error a `RestSession` request can fail with,
+    whether Discord answered or the request was never sent"""
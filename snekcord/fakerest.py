@@ -0,0 +1,750 @@
+import asyncio
+import bisect
+import hashlib
+import random
+import re
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+
+from httpx import AsyncBaseTransport, Response
+
+from . import rest
+from .ratelimit import MAJOR_PARAMETERS
+from .utils import Snowflake, json_dumps, json_loads
+
+__all__ = ('FakeDiscordModel', 'FakeDiscordTransport')
+
+BULK_DELETE_MAX_AGE = 60 * 60 * 24 * 14
+
+_PLACEHOLDER_PATTERN = re.compile(r'%\((\w+)\)s')
+
+_handlers = {}
+
+
+def _handles(*endpoints):
+    def decorator(func):
+        for endpoint in endpoints:
+            _handlers[endpoint] = func.__name__
+        return func
+    return decorator
+
+
+class _Route:
+    __slots__ = ('endpoint', 'pattern', 'handler', 'bucket_hash')
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.handler = _handlers.get(endpoint)
+        self.bucket_hash = hashlib.sha1(
+            endpoint.route.encode()).hexdigest()[:16]
+
+        url = endpoint.url.replace(rest.BASE_API_URL, '')
+        pattern = ''
+        position = 0
+
+        for match in _PLACEHOLDER_PATTERN.finditer(url):
+            pattern += re.escape(url[position:match.start()])
+            pattern += f'(?P<{match.group(1)}>[^/]+)'
+            position = match.end()
+
+        pattern += re.escape(url[position:])
+        self.pattern = re.compile(f'/api/v\\d+/{pattern}')
+
+
+def _compile_routes():
+    endpoints = [value for value in vars(rest).values()
+                 if isinstance(value, rest.HTTPEndpoint)]
+
+    # Literal segments win over placeholders, e.g. users/@me over
+    # users/%(user_id)s, the first endpoint in the table breaks ties
+    endpoints.sort(key=lambda endpoint: (
+        len(_PLACEHOLDER_PATTERN.findall(endpoint.url)),
+        -len(_PLACEHOLDER_PATTERN.sub('', endpoint.url))))
+
+    routes = {}
+    for endpoint in endpoints:
+        routes.setdefault(endpoint.method, []).append(_Route(endpoint))
+
+    return routes
+
+
+class _Bucket:
+    __slots__ = ('remaining', 'reset_at')
+
+    def __init__(self, limit):
+        self.remaining = limit
+        self.reset_at = None
+
+
+class FakeDiscordModel:
+    """The seeded data served by a `FakeDiscordTransport`, every
+    collection is a plain dict keyed by snowflake so tests can
+    inspect and modify it directly
+
+    Arguments:
+        seed int: The seed for the generated data
+
+        guilds int: The number of guilds
+
+        channels int: The number of text channels per guild
+
+        members int: The number of members per guild
+
+        messages int: The number of messages per channel, one a minute
+            going back from now
+
+        now Optional[float]: The time the data is generated relative to
+    """
+
+    def __init__(self, seed=0, *, guilds=2, channels=3, members=100,
+                 messages=100, now=None):
+        self.random = random.Random(seed)
+        self.now = time.time() if now is None else now
+
+        self._increment = 0
+
+        self.users = {}
+        self.guilds = {}
+        self.channels = {}
+        self.members = {}
+        self.roles = {}
+        self.bans = {}
+        self.audit_logs = {}
+        self.messages = {}
+        self.message_ids = {}
+        self.webhooks = {}
+        self.invites = {}
+
+        self.client_user = self.create_user(bot=True)
+
+        for _ in range(guilds):
+            self._seed_guild(channels, members, messages)
+
+    def snowflake(self, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+
+        self._increment = (self._increment + 1) & Snowflake.INCREMENT_MASK
+        return str(Snowflake.build(timestamp, worker_id=1,
+                                   increment=self._increment))
+
+    def _timestamp(self, age):
+        return self.now - age
+
+    def create_user(self, *, bot=False, age=0):
+        user_id = self.snowflake(self._timestamp(age))
+        user = self.users[user_id] = {
+            'id': user_id,
+            'username': f'user{len(self.users)}',
+            'discriminator': f'{self.random.randrange(10000):04}',
+            'avatar': None,
+            'bot': bot,
+        }
+        return user
+
+    def _seed_guild(self, channels, members, messages):
+        age = 60 * 60 * 24 * 365
+        guild_id = self.snowflake(self._timestamp(age))
+
+        self.guilds[guild_id] = {
+            'id': guild_id,
+            'name': f'guild{len(self.guilds)}',
+            'icon': None,
+            'splash': None,
+            'discovery_splash': None,
+            'owner_id': self.client_user['id'],
+            'region': 'us-east',
+            'afk_channel_id': None,
+            'afk_timeout': 300,
+            'verification_level': 0,
+            'default_message_notifications': 0,
+            'explicit_content_filter': 0,
+            'features': [],
+            'mfa_level': 0,
+            'system_channel_id': None,
+            'premium_tier': 0,
+            'preferred_locale': 'en-US',
+            'nsfw': False,
+        }
+
+        self.roles[guild_id] = {guild_id: {
+            'id': guild_id, 'name': '@everyone', 'color': 0,
+            'hoist': False, 'position': 0, 'permissions': '0',
+            'managed': False, 'mentionable': False,
+        }}
+
+        self.members[guild_id] = {}
+        self.bans[guild_id] = {}
+        self.audit_logs[guild_id] = {}
+
+        self._add_member(guild_id, self.client_user)
+        for i in range(members - 1):
+            self._add_member(guild_id, self.create_user(age=age - i))
+
+        for i in range(channels):
+            channel_id = self.snowflake(self._timestamp(age - i))
+            self.channels[channel_id] = {
+                'id': channel_id,
+                'type': 0,
+                'guild_id': guild_id,
+                'name': f'channel{i}',
+                'position': i,
+                'topic': None,
+                'nsfw': False,
+                'last_message_id': None,
+                'permission_overwrites': [],
+                'parent_id': None,
+            }
+            self.messages[channel_id] = {}
+            self.message_ids[channel_id] = []
+
+            user_ids = list(self.members[guild_id])
+            for j in range(messages):
+                author = self.users[self.random.choice(user_ids)]
+                self.create_message(
+                    channel_id, author, {'content': f'message {j}'},
+                    age=(messages - j) * 60)
+
+            webhook_id = self.snowflake(self._timestamp(age - i))
+            self.webhooks[webhook_id] = {
+                'id': webhook_id,
+                'type': 1,
+                'guild_id': guild_id,
+                'channel_id': channel_id,
+                'name': f'webhook{i}',
+                'avatar': None,
+                'token': f'token{webhook_id}',
+            }
+
+            code = f'invite{len(self.invites)}'
+            self.invites[code] = {
+                'code': code,
+                'guild': {'id': guild_id,
+                          'name': self.guilds[guild_id]['name']},
+                'channel': {'id': channel_id, 'name': f'channel{i}',
+                            'type': 0},
+            }
+
+    def _add_member(self, guild_id, user):
+        self.members[guild_id][user['id']] = {
+            'user': user,
+            'nick': None,
+            'roles': [],
+            'joined_at': '2021-01-01T00:00:00+00:00',
+            'deaf': False,
+            'mute': False,
+        }
+
+    def create_message(self, channel_id, author, data, age=None):
+        timestamp = None if age is None else self._timestamp(age)
+        message_id = self.snowflake(timestamp)
+
+        message = {
+            'id': message_id,
+            'channel_id': channel_id,
+            'guild_id': self.channels[channel_id].get('guild_id'),
+            'author': author,
+            'content': data.get('content', ''),
+            'timestamp': '2021-01-01T00:00:00+00:00',
+            'edited_timestamp': None,
+            'tts': data.get('tts', False),
+            'mention_everyone': False,
+            'mentions': [],
+            'mention_roles': [],
+            'attachments': data.get('attachments', []),
+            'embeds': data.get('embeds', []),
+            'pinned': False,
+            'type': 0,
+        }
+
+        self.messages[channel_id][message_id] = message
+        bisect.insort(self.message_ids[channel_id], int(message_id))
+        self.channels[channel_id]['last_message_id'] = message_id
+
+        return message
+
+    def delete_message(self, channel_id, message_id):
+        message = self.messages[channel_id].pop(message_id, None)
+        if message is not None:
+            ids = self.message_ids[channel_id]
+            del ids[bisect.bisect_left(ids, int(message_id))]
+        return message
+
+    def add_audit_log_entry(self, guild_id, action_type, target_id=None,
+                            changes=(), reason=None):
+        entry_id = self.snowflake()
+        entry = self.audit_logs[guild_id][entry_id] = {
+            'id': entry_id,
+            'user_id': self.client_user['id'],
+            'target_id': target_id,
+            'action_type': action_type,
+            'changes': list(changes),
+            'reason': reason,
+        }
+        return entry
+
+
+class FakeDiscordTransport(AsyncBaseTransport):
+    """An httpx transport that answers requests for every endpoint in
+    `snekcord.rest` from a `FakeDiscordModel` instead of the network,
+    with Discord's rate limit headers and 429s
+
+    Endpoints without a dedicated handler answer GETs with an empty
+    object, DELETEs with 204 and everything else by echoing the JSON
+    body back with a new id.
+
+    Arguments:
+        model Optional[FakeDiscordModel]: The data to serve, a model
+            seeded with `seed` by default
+
+        seed int: The seed for the model and for the latency jitter
+
+        latency float: The number of seconds every response is delayed
+
+        jitter float: The maximum number of seconds randomly added to
+            the latency
+
+        ratelimits bool: Whether to enforce rate limits
+
+        bucket_limit int: The number of requests each bucket allows per
+            `bucket_reset` seconds
+
+        bucket_reset float: The number of seconds until a bucket resets
+
+        global_limit int: The number of requests allowed per second
+            across all buckets
+
+        shards int: The recommended shard count for /gateway/bot
+
+        max_concurrency int: The identify concurrency for /gateway/bot
+
+    Example:
+        rest = RestSession(manager, transport=FakeDiscordTransport())
+    """
+
+    def __init__(self, model=None, *, seed=0, latency=0.0, jitter=0.0,
+                 ratelimits=True, bucket_limit=5, bucket_reset=1.0,
+                 global_limit=50, shards=1, max_concurrency=1):
+        self.model = model if model is not None else FakeDiscordModel(seed)
+        self.random = random.Random(seed)
+
+        self.latency = latency
+        self.jitter = jitter
+
+        self.ratelimits = ratelimits
+        self.bucket_limit = bucket_limit
+        self.bucket_reset = bucket_reset
+        self.global_limit = global_limit
+
+        self.shards = shards
+        self.max_concurrency = max_concurrency
+
+        self.requests = 0
+        self.ratelimited = 0
+
+        self._routes = _compile_routes()
+        self._buckets = {}
+        self._global_tokens = global_limit
+        self._global_updated_at = time.monotonic()
+
+    def _match(self, method, path):
+        for route in self._routes.get(method, ()):
+            match = route.pattern.fullmatch(path)
+            if match is not None:
+                return route, match.groupdict()
+        return None, None
+
+    def _json(self, status, data, headers=None):
+        headers = {**(headers or {}), 'Content-Type': 'application/json'}
+        return Response(status, headers=headers, content=json_dumps(data))
+
+    def _error(self, status, message, code=0):
+        return self._json(status, {'message': message, 'code': code})
+
+    def _ratelimit(self, route, fmt):
+        now = time.monotonic()
+
+        self._global_tokens = min(
+            self.global_limit,
+            self._global_tokens
+            + (now - self._global_updated_at) * self.global_limit)
+        self._global_updated_at = now
+
+        if self._global_tokens < 1:
+            retry_after = (1 - self._global_tokens) / self.global_limit
+            return self._json(429, {
+                'message': 'You are being rate limited.',
+                'retry_after': retry_after,
+                'global': True,
+            }, {'Retry-After': str(retry_after),
+                'X-RateLimit-Global': 'true',
+                'X-RateLimit-Scope': 'global'}), None
+
+        self._global_tokens -= 1
+
+        key = (route.endpoint.route,
+               tuple(fmt.get(name) for name in MAJOR_PARAMETERS))
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(self.bucket_limit)
+
+        if bucket.reset_at is not None and now >= bucket.reset_at:
+            bucket.remaining = self.bucket_limit
+            bucket.reset_at = None
+
+        if bucket.reset_at is None:
+            bucket.reset_at = now + self.bucket_reset
+
+        reset_after = bucket.reset_at - now
+        headers = {
+            'X-RateLimit-Limit': str(self.bucket_limit),
+            'X-RateLimit-Reset': str(time.time() + reset_after),
+            'X-RateLimit-Reset-After': f'{reset_after:.3f}',
+            'X-RateLimit-Bucket': route.bucket_hash,
+        }
+
+        if bucket.remaining <= 0:
+            headers['X-RateLimit-Remaining'] = '0'
+            headers['X-RateLimit-Scope'] = 'user'
+            headers['Retry-After'] = f'{reset_after:.3f}'
+            return self._json(429, {
+                'message': 'You are being rate limited.',
+                'retry_after': reset_after,
+                'global': False,
+            }, headers), None
+
+        bucket.remaining -= 1
+        headers['X-RateLimit-Remaining'] = str(bucket.remaining)
+
+        return None, headers
+
+    def _parse_body(self, request):
+        content = request.content
+        if not content:
+            return None
+
+        content_type = request.headers.get('Content-Type', '')
+
+        if content_type.startswith('multipart/form-data'):
+            message = BytesParser(policy=HTTP).parsebytes(
+                b'Content-Type: ' + content_type.encode() + b'\r\n\r\n'
+                + content)
+
+            data = {}
+            attachments = []
+
+            for part in message.iter_parts():
+                name = part.get_param('name', header='Content-Disposition')
+                if name == 'payload_json':
+                    data = json_loads(part.get_payload(decode=True))
+                else:
+                    attachments.append({
+                        'id': self.model.snowflake(),
+                        'filename': part.get_filename(),
+                        'size': len(part.get_payload(decode=True)),
+                    })
+
+            data.setdefault('attachments', attachments)
+            return data
+
+        return json_loads(content)
+
+    async def handle_async_request(self, request):
+        await request.aread()
+
+        self.requests += 1
+
+        delay = self.latency
+        if self.jitter:
+            delay += self.random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+        route, fmt = self._match(request.method, request.url.path)
+        if route is None:
+            return self._error(404, '404: Not Found')
+
+        headers = None
+        if self.ratelimits:
+            response, headers = self._ratelimit(route, fmt)
+            if response is not None:
+                self.ratelimited += 1
+                return response
+
+        params = dict(request.url.params)
+        body = self._parse_body(request)
+
+        if route.handler is not None:
+            handler = getattr(self, route.handler)
+            try:
+                result = handler(fmt, params, body)
+            except KeyError:
+                return self._error(404, 'Unknown Resource', 10000)
+        else:
+            result = self._default(request.method, body)
+
+        if isinstance(result, Response):
+            result.headers.update(headers or {})
+            return result
+
+        if result is None:
+            return Response(204, headers=headers)
+
+        return self._json(200, result, headers)
+
+    def _default(self, method, body):
+        if method == 'GET':
+            return {}
+
+        if method == 'DELETE':
+            return None
+
+        data = body if isinstance(body, dict) else {}
+        return {**data, 'id': self.model.snowflake()}
+
+    def _paginate(self, ids, params, default_limit, max_limit):
+        limit = min(int(params.get('limit', default_limit)), max_limit)
+
+        if 'around' in params:
+            index = bisect.bisect_left(ids, int(params['around']))
+            start = max(index - limit // 2, 0)
+            return ids[start:start + limit]
+
+        if 'before' in params:
+            end = bisect.bisect_left(ids, int(params['before']))
+            return ids[max(end - limit, 0):end]
+
+        if 'after' in params:
+            start = bisect.bisect_right(ids, int(params['after']))
+            return ids[start:start + limit]
+
+        return ids[-limit:]
+
+    @_handles(rest.get_gateway)
+    def _get_gateway(self, fmt, params, body):
+        return {'url': 'wss://gateway.discord.gg'}
+
+    @_handles(rest.get_gateway_bot)
+    def _get_gateway_bot(self, fmt, params, body):
+        return {
+            'url': 'wss://gateway.discord.gg',
+            'shards': self.shards,
+            'session_start_limit': {
+                'total': 1000,
+                'remaining': 1000,
+                'reset_after': 0,
+                'max_concurrency': self.max_concurrency,
+            },
+        }
+
+    @_handles(rest.get_user_client)
+    def _get_user_client(self, fmt, params, body):
+        return self.model.client_user
+
+    @_handles(rest.get_user)
+    def _get_user(self, fmt, params, body):
+        return self.model.users[fmt['user_id']]
+
+    @_handles(rest.get_guild, rest.get_guild_preview)
+    def _get_guild(self, fmt, params, body):
+        return self.model.guilds[fmt['guild_id']]
+
+    @_handles(rest.modify_guild)
+    def _modify_guild(self, fmt, params, body):
+        guild = self.model.guilds[fmt['guild_id']]
+        guild.update(body)
+        return guild
+
+    @_handles(rest.get_guild_channels)
+    def _get_guild_channels(self, fmt, params, body):
+        self.model.guilds[fmt['guild_id']]
+        return [channel for channel in self.model.channels.values()
+                if channel.get('guild_id') == fmt['guild_id']]
+
+    @_handles(rest.get_guild_roles)
+    def _get_guild_roles(self, fmt, params, body):
+        return list(self.model.roles[fmt['guild_id']].values())
+
+    @_handles(rest.create_guild_role)
+    def _create_guild_role(self, fmt, params, body):
+        roles = self.model.roles[fmt['guild_id']]
+        role_id = self.model.snowflake()
+        role = roles[role_id] = {
+            'id': role_id, 'name': 'new role', 'color': 0, 'hoist': False,
+            'position': len(roles), 'permissions': '0', 'managed': False,
+            'mentionable': False, **(body or {}),
+        }
+        return role
+
+    @_handles(rest.delete_guild_role)
+    def _delete_guild_role(self, fmt, params, body):
+        del self.model.roles[fmt['guild_id']][fmt['role_id']]
+
+    @_handles(rest.get_guild_member)
+    def _get_guild_member(self, fmt, params, body):
+        return self.model.members[fmt['guild_id']][fmt['user_id']]
+
+    @_handles(rest.get_guild_members)
+    def _get_guild_members(self, fmt, params, body):
+        members = self.model.members[fmt['guild_id']]
+        ids = sorted(int(user_id) for user_id in members)
+        params = {'after': '0', **params}
+        return [members[str(user_id)]
+                for user_id in self._paginate(ids, params, 1, 1000)]
+
+    @_handles(rest.remove_guild_member)
+    def _remove_guild_member(self, fmt, params, body):
+        del self.model.members[fmt['guild_id']][fmt['user_id']]
+
+    @_handles(rest.get_guild_bans)
+    def _get_guild_bans(self, fmt, params, body):
+        return list(self.model.bans[fmt['guild_id']].values())
+
+    @_handles(rest.get_guild_ban)
+    def _get_guild_ban(self, fmt, params, body):
+        return self.model.bans[fmt['guild_id']][fmt['user_id']]
+
+    @_handles(rest.create_guild_ban)
+    def _create_guild_ban(self, fmt, params, body):
+        body = body or {}
+        user = self.model.users[fmt['user_id']]
+
+        self.model.members[fmt['guild_id']].pop(fmt['user_id'], None)
+        self.model.bans[fmt['guild_id']][fmt['user_id']] = {
+            'user': user, 'reason': body.get('reason')}
+        self.model.add_audit_log_entry(
+            fmt['guild_id'], 22, fmt['user_id'], reason=body.get('reason'))
+
+    @_handles(rest.remove_guild_ban)
+    def _remove_guild_ban(self, fmt, params, body):
+        del self.model.bans[fmt['guild_id']][fmt['user_id']]
+        self.model.add_audit_log_entry(fmt['guild_id'], 23, fmt['user_id'])
+
+    @_handles(rest.get_guild_audit_log)
+    def _get_guild_audit_log(self, fmt, params, body):
+        entries = self.model.audit_logs[fmt['guild_id']]
+
+        if 'before' not in params and 'after' not in params:
+            params = {**params, 'before': str(1 << 63)}
+
+        ids = sorted(int(entry_id) for entry_id, entry in entries.items()
+                     if params.get('user_id') in (None, entry['user_id'])
+                     and int(params.get('action_type', 0))
+                     in (0, entry['action_type']))
+
+        page = self._paginate(ids, params, 50, 100)
+        entries = [entries[str(entry_id)] for entry_id in reversed(page)]
+
+        user_ids = {entry['user_id'] for entry in entries}
+        return {
+            'audit_log_entries': entries,
+            'users': [self.model.users[user_id] for user_id in user_ids],
+            'webhooks': [],
+            'integrations': [],
+        }
+
+    @_handles(rest.get_channel)
+    def _get_channel(self, fmt, params, body):
+        return self.model.channels[fmt['channel_id']]
+
+    @_handles(rest.modify_channel)
+    def _modify_channel(self, fmt, params, body):
+        channel = self.model.channels[fmt['channel_id']]
+        channel.update(body)
+        return channel
+
+    @_handles(rest.delete_channel)
+    def _delete_channel(self, fmt, params, body):
+        self.model.messages.pop(fmt['channel_id'], None)
+        self.model.message_ids.pop(fmt['channel_id'], None)
+        return self.model.channels.pop(fmt['channel_id'])
+
+    @_handles(rest.get_channel_messages)
+    def _get_channel_messages(self, fmt, params, body):
+        messages = self.model.messages[fmt['channel_id']]
+        ids = self._paginate(
+            self.model.message_ids[fmt['channel_id']], params, 50, 100)
+        return [messages[str(message_id)] for message_id in reversed(ids)]
+
+    @_handles(rest.get_channel_message)
+    def _get_channel_message(self, fmt, params, body):
+        return self.model.messages[fmt['channel_id']][fmt['message_id']]
+
+    @_handles(rest.create_channel_message)
+    def _create_channel_message(self, fmt, params, body):
+        self.model.channels[fmt['channel_id']]
+        return self.model.create_message(
+            fmt['channel_id'], self.model.client_user, body or {})
+
+    @_handles(rest.edit_message)
+    def _edit_message(self, fmt, params, body):
+        message = self.model.messages[fmt['channel_id']][fmt['message_id']]
+        message.update(body or {})
+        return message
+
+    @_handles(rest.delete_message)
+    def _delete_message(self, fmt, params, body):
+        self.model.messages[fmt['channel_id']]
+        if self.model.delete_message(
+                fmt['channel_id'], fmt['message_id']) is None:
+            return self._error(404, 'Unknown Message', 10008)
+
+    @_handles(rest.bulk_delete_messages)
+    def _bulk_delete_messages(self, fmt, params, body):
+        message_ids = (body or {}).get('messages', ())
+
+        if not 2 <= len(message_ids) <= 100:
+            return self._error(400, 'Invalid Form Body', 50035)
+
+        cutoff = time.time() - BULK_DELETE_MAX_AGE
+        if any(Snowflake(message_id).timestamp < cutoff
+               for message_id in message_ids):
+            return self._error(
+                400, 'You can only bulk delete messages that are under '
+                     '14 days old.', 50034)
+
+        for message_id in message_ids:
+            self.model.delete_message(fmt['channel_id'], str(message_id))
+
+    @_handles(rest.get_channel_webhooks)
+    def _get_channel_webhooks(self, fmt, params, body):
+        return [webhook for webhook in self.model.webhooks.values()
+                if webhook['channel_id'] == fmt['channel_id']]
+
+    @_handles(rest.get_webhook)
+    def _get_webhook(self, fmt, params, body):
+        return self.model.webhooks[fmt['webhook_id']]
+
+    def _get_webhook_by_token(self, fmt):
+        webhook = self.model.webhooks[fmt['webhook_id']]
+        if webhook['token'] != fmt['webhook_token']:
+            raise KeyError(fmt['webhook_token'])
+        return webhook
+
+    @_handles(rest.get_webhook_with_token)
+    def _get_webhook_with_token(self, fmt, params, body):
+        return self._get_webhook_by_token(fmt)
+
+    @_handles(rest.execute_webhook)
+    def _execute_webhook(self, fmt, params, body):
+        webhook = self._get_webhook_by_token(fmt)
+
+        author = {'id': webhook['id'], 'username': webhook['name'],
+                  'discriminator': '0000', 'avatar': None, 'bot': True}
+        message = self.model.create_message(
+            webhook['channel_id'], author, body or {})
+        message['webhook_id'] = webhook['id']
+
+        if params.get('wait', '').lower() == 'true':
+            return message
+
+    @_handles(rest.get_invite)
+    def _get_invite(self, fmt, params, body):
+        return self.model.invites[fmt['invite_code']]
+
+    @_handles(rest.get_voice_regions, rest.get_guild_voice_regions)
+    def _get_voice_regions(self, fmt, params, body):
+        return [{'id': 'us-east', 'name': 'US East', 'optimal': True,
+                 'deprecated': False, 'custom': False}]
@@ -2,6 +2,7 @@ import asyncio
 import signal
 
 from .rest import RestSession
+from .states.auditlogstate import AuditLogState
 from .states.channelstate import ChannelState, GuildChannelState
 from .states.emojistate import GuildEmojiState
 from .states.guildstate import GuildBanState, GuildState
@@ -19,6 +20,7 @@ __all__ = ('BaseManager',)
 
 class BaseManager(EventDispatcher):
     DEFAULT_CLASSES = {
+        'AuditLogState': AuditLogState,
         'ChannelState': ChannelState,
         'GuildChannelState': GuildChannelState,
         'GuildEmojiState': GuildEmojiState,
@@ -38,13 +40,18 @@ class BaseManager(EventDispatcher):
     __classes__ = DEFAULT_CLASSES.copy()
     __handled_signals__ = [signal.SIGINT, signal.SIGTERM]
 
-    def __init__(self, token, *, loop=None, api_version='9'):
+    def __init__(self, token, *, loop=None, api_version='9',
+                 rest_options=None):
         super().__init__(loop=loop)
 
         self.token = token
         self.api_version = f'v{api_version}'
 
-        self.rest = self.get_class('RestSession')(manager=self)
+        if rest_options is None:
+            rest_options = {}
+
+        self.rest = self.get_class('RestSession')(manager=self,
+                                                  **rest_options)
         self.channels = self.get_class('ChannelState')(manager=self)
         self.guilds = self.get_class('GuildState')(manager=self)
         self.invites = self.get_class('InviteState')(manager=self)
@@ -111,6 +118,9 @@ class BaseManager(EventDispatcher):
             except BaseException:
                 pass
 
+        if self.rest.warmup_on_start:
+            self.loop.create_task(self.rest.warmup())
+
         try:
             self.loop.run_forever()
         except BaseException as exc:
@@ -1,7 +1,9 @@
+from .auditlogobject import *
 from .baseobject import *
 from .channelobject import *
 from .embedobject import *
 from .emojiobject import *
+from .fileobject import *
 from .guildobject import *
 from .integrationobject import *
 from .inviteobject import *
@@ -0,0 +1,49 @@
+from .baseobject import BaseObject, BaseTemplate
+from ..utils import JsonArray, JsonField, JsonTemplate, Snowflake
+
+__all__ = ('AuditLogChange', 'AuditLogEntry')
+
+
+AuditLogChange = JsonTemplate(
+    key=JsonField('key'),
+    new_value=JsonField('new_value'),
+    old_value=JsonField('old_value'),
+).default_object('AuditLogChange')
+
+
+AuditLogEntryTemplate = JsonTemplate(
+    target_id=JsonField('target_id', Snowflake, str),
+    user_id=JsonField('user_id', Snowflake, str),
+    action_type=JsonField('action_type'),
+    changes=JsonArray('changes', object=AuditLogChange),
+    options=JsonField('options'),
+    reason=JsonField('reason'),
+    __extends__=(BaseTemplate,)
+)
+
+
+class AuditLogEntry(BaseObject, template=AuditLogEntryTemplate):
+    """An action taken in a guild, as recorded in its audit log
+
+    Attributes:
+        target_id Optional[Snowflake]: The id of the affected entity
+
+        user_id Optional[Snowflake]: The id of the user who took the action
+
+        action_type int: The type of the action
+
+        changes list[AuditLogChange]: The changes made to the target
+
+        options Optional[dict]: Extra information for some action types
+
+        reason Optional[str]: The reason given for the action
+    """
+    __slots__ = ()
+
+    @property
+    def guild(self):
+        return self.state.guild
+
+    @property
+    def user(self):
+        return self.state.manager.users.get(self.user_id)
@@ -0,0 +1,94 @@
+import io
+import os
+
+__all__ = ('File',)
+
+
+class _MemoryReader(io.RawIOBase):
+    # Reads straight out of a bytes-like object in chunks so
+    # that uploading it never makes a copy of the whole buffer
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast('B')
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        view = self._view[self._position:self._position + len(buffer)]
+        length = len(view)
+        buffer[:length] = view
+        self._position += length
+        return length
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_SET:
+            position = offset
+        elif whence == os.SEEK_CUR:
+            position = self._position + offset
+        elif whence == os.SEEK_END:
+            position = len(self._view) + offset
+        else:
+            raise ValueError(f'Invalid whence ({whence!r})')
+
+        self._position = max(position, 0)
+        return self._position
+
+
+class File:
+    """An attachment to upload with a message
+
+    Attributes:
+        fp str|PathLike|BinaryIO|bytes|memoryview: The file's contents,
+            paths are opened lazily when the request is sent and file
+            objects and buffers are streamed in chunks, never read
+            fully into memory
+
+        filename str: The name of the file on Discord
+
+        content_type Optional[str]: The file's content type, guessed
+            from the filename by default
+
+    Arguments:
+        spoiler bool: Whether the file is marked as a spoiler, the
+            filename is then prefixed with `SPOILER_` unless it
+            already is
+    """
+    __slots__ = ('fp', 'filename', 'content_type')
+
+    def __init__(self, fp, filename=None, *, content_type=None,
+                 spoiler=False):
+        self.fp = fp
+
+        if filename is None:
+            if isinstance(fp, (str, os.PathLike)):
+                filename = os.path.basename(fp)
+            else:
+                filename = os.path.basename(getattr(fp, 'name', 'file'))
+
+        if spoiler and not filename.startswith('SPOILER_'):
+            filename = f'SPOILER_{filename}'
+
+        self.filename = filename
+        self.content_type = content_type
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(filename={self.filename!r})'
+
+    def open(self):
+        """Returns a binary file object for the upload and whether
+        the caller is responsible for closing it
+        """
+        if isinstance(self.fp, (str, os.PathLike)):
+            return open(self.fp, 'rb'), True
+
+        if isinstance(self.fp, (bytes, bytearray, memoryview)):
+            return _MemoryReader(self.fp), True
+
+        return self.fp, False
@@ -61,7 +61,7 @@ GuildTemplate = JsonTemplate(
 
 class Guild(BaseObject, template=GuildTemplate):
     __slots__ = ('widget', 'vanity_url', 'welcome_screen', 'channels',
-                 'emojis', 'roles', 'members')
+                 'emojis', 'roles', 'members', 'audit_log')
 
     def __init__(self, *, state):
         super().__init__(state=state)
@@ -86,6 +86,10 @@ class Guild(BaseObject, template=GuildTemplate):
             manager=self.state.manager,
             guild=self)
 
+        self.audit_log = self.state.manager.get_class('AuditLogState')(
+            manager=self.state.manager,
+            guild=self)
+
     async def modify(self, **kwargs):
         keys = rest.modify_guild.keys
 
@@ -17,11 +17,12 @@ GuildMemberTemplate = JsonTemplate(
 
 
 class GuildMember(BaseObject, template=GuildMemberTemplate):
-    __slots__ = ('guild', 'roles')
+    __slots__ = ('guild', 'user', 'roles')
 
     def __init__(self, *, state, guild):
         super().__init__(state=state)
         self.guild = guild
+        self.user = None
         self.roles = self.state.manager.get_class('GuildMemberRoleState')(
             superstate=self.guild.roles, member=self)
 
@@ -0,0 +1,452 @@
+import asyncio
+import collections
+import enum
+import heapq
+import itertools
+import os
+import time
+
+from .utils import _remove_stale_socket
+
+__all__ = ('MAJOR_PARAMETERS', 'RequestPriority', 'RateLimitBucket',
+           'GlobalRateLimit', 'UnixGlobalRateLimit',
+           'GlobalRateLimitCoordinator', 'run_coordinator', 'RateLimiter')
+
+MAJOR_PARAMETERS = ('channel_id', 'guild_id', 'webhook_id')
+
+GLOBAL_RATE = 50
+GLOBAL_PER = 1.0
+
+# Used when Discord doesn't say when an exhausted bucket resets
+DEFAULT_RESET_AFTER = 1.0
+
+# How often the buckets that have gone idle are dropped
+BUCKET_SWEEP_INTERVAL = 60.0
+
+
+def _get_float(headers, name):
+    value = headers.get(name)
+    if value is not None:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return None
+
+
+class RequestPriority(enum.IntEnum):
+    """The lanes outbound requests are scheduled in, lower values win
+
+    | Name          | Description                                     |
+    | ------------- | ----------------------------------------------- |
+    | `INTERACTIVE` | Requests a user is waiting on, e.g. replies     |
+    | `NORMAL`      | Everything that doesn't say otherwise           |
+    | `BULK`        | Background jobs like crawls, exports and syncs  |
+    """
+    INTERACTIVE = 0
+    NORMAL = 1
+    BULK = 2
+
+
+class RateLimitBucket:
+    def __init__(self, key):
+        self.key = key
+        self.hash = None
+        self.limit = 1
+        self.remaining = 1
+        self.reset_at = None
+        self.unlimited = False
+
+        self._inflight = 0
+        self._waiters = []
+        self._counter = itertools.count()
+        self._timer = None
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(key={self.key!r}, '
+                f'limit={self.limit}, remaining={self.remaining})')
+
+    def _reset(self, now):
+        if self.reset_at is not None and now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = None
+
+    def _wakeup(self):
+        # Hands out whatever slots the bucket has to the waiters with
+        # the highest priority, in the order they arrived within a lane
+        now = time.monotonic()
+        self._reset(now)
+
+        while self._waiters:
+            waiter = self._waiters[0][2]
+
+            if waiter.done():
+                heapq.heappop(self._waiters)
+                continue
+
+            if not self.unlimited:
+                if self.remaining <= 0:
+                    break
+                self.remaining -= 1
+
+            heapq.heappop(self._waiters)
+            self._inflight += 1
+            waiter.set_result(None)
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        # If nothing is in flight to update the bucket, the reset is
+        # the only thing that can free a slot so wake up for it
+        if self._waiters and self.reset_at is not None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(
+                max(self.reset_at - now, 0), self._wakeup)
+
+    def get_delay(self):
+        # How long a new request would have to wait for a slot, 0 if
+        # one is free or the bucket is waiting on an in-flight update
+        now = time.monotonic()
+        self._reset(now)
+
+        if (self.unlimited or self.remaining > len(self._waiters)
+                or self.reset_at is None):
+            return 0.0
+
+        return max(self.reset_at - now, 0.0)
+
+    def is_idle(self, now):
+        # Nothing is waiting on or using the bucket and it will be
+        # full again by now, so forgetting it loses nothing
+        return (not self._waiters and self._inflight == 0
+                and (self.reset_at is None or now >= self.reset_at))
+
+    async def acquire(self, priority=RequestPriority.NORMAL):
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), waiter))
+        self._wakeup()
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled
+                self.release()
+            raise
+
+    def _done(self):
+        if self._inflight > 0:
+            self._inflight -= 1
+
+    def release(self):
+        # Called when a request never got a response, give its slot back
+        self._done()
+        if not self.unlimited and self.remaining < self.limit:
+            self.remaining += 1
+        self._wakeup()
+
+    def update(self, headers):
+        self._done()
+
+        limit = _get_float(headers, 'X-RateLimit-Limit')
+        remaining = _get_float(headers, 'X-RateLimit-Remaining')
+        reset_after = _get_float(headers, 'X-RateLimit-Reset-After')
+
+        if limit is None or remaining is None:
+            self.unlimited = True
+        else:
+            self.unlimited = False
+            self.limit = int(limit)
+            # Requests sent after this one aren't accounted
+            # for by Discord yet, so take them off the top
+            self.remaining = max(int(remaining) - self._inflight, 0)
+
+            now = time.monotonic()
+            if reset_after is not None:
+                self.reset_at = now + reset_after
+            elif self.remaining <= 0 and (self.reset_at is None
+                                          or now >= self.reset_at):
+                # Without a reset nothing would ever refill the bucket
+                self.reset_at = now + DEFAULT_RESET_AFTER
+
+        self._wakeup()
+
+    def block(self, retry_after):
+        self._done()
+        self.remaining = 0
+        self.reset_at = time.monotonic() + retry_after
+        self._wakeup()
+
+
+class GlobalRateLimit:
+    """An in-process token bucket for Discord's global rate limit"""
+
+    def __init__(self, rate=GLOBAL_RATE, per=GLOBAL_PER):
+        self.rate = rate
+        self.per = per
+        self.tokens = rate
+        self.updated_at = time.monotonic()
+        self.blocked_until = None
+
+    def reserve(self):
+        # Takes a token (possibly going into debt) and returns
+        # how long the caller has to wait before it is usable
+        now = time.monotonic()
+
+        self.tokens = min(
+            self.rate,
+            self.tokens + (now - self.updated_at) * self.rate / self.per)
+        self.updated_at = now
+        self.tokens -= 1
+
+        delay = 0.0
+        if self.tokens < 0:
+            delay = -self.tokens * self.per / self.rate
+
+        if self.blocked_until is not None:
+            if self.blocked_until > now:
+                delay = max(delay, self.blocked_until - now)
+            else:
+                self.blocked_until = None
+
+        return delay
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def block(self, retry_after):
+        blocked_until = time.monotonic() + retry_after
+        if self.blocked_until is None or blocked_until > self.blocked_until:
+            self.blocked_until = blocked_until
+
+    async def close(self):
+        pass
+
+
+class UnixGlobalRateLimit(GlobalRateLimit):
+    """A global rate limit shared by every process connected
+    to the same `GlobalRateLimitCoordinator`, falls back to
+    an in-process bucket if the coordinator can't be reached"""
+
+    def __init__(self, path, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.path = path
+
+        self._reader = None
+        self._writer = None
+        self._waiters = collections.deque()
+        self._connect_lock = asyncio.Lock()
+        self._read_task = None
+
+    async def _connect(self):
+        async with self._connect_lock:
+            if self._writer is None:
+                self._reader, self._writer = \
+                    await asyncio.open_unix_connection(self.path)
+                self._read_task = asyncio.ensure_future(self._read_loop())
+
+    async def _read_loop(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+
+                waiter = self._waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(float(line))
+        finally:
+            self._writer = None
+
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if not waiter.done():
+                    waiter.set_exception(ConnectionResetError())
+
+    async def _reserve(self):
+        await self._connect()
+
+        if self._writer is None:
+            raise ConnectionResetError
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._writer.write(b'A\n')
+
+        return await waiter
+
+    async def acquire(self):
+        try:
+            delay = await self._reserve()
+        except OSError:
+            delay = self.reserve()
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def block(self, retry_after):
+        super().block(retry_after)
+
+        if self._writer is not None:
+            self._writer.write(b'B %f\n' % retry_after)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+        if self._read_task is not None:
+            await asyncio.gather(self._read_task, return_exceptions=True)
+
+
+class GlobalRateLimitCoordinator:
+    """A Unix socket server that hands out global rate limit tokens
+    to every `UnixGlobalRateLimit` on the host"""
+
+    def __init__(self, path, rate=GLOBAL_RATE, per=GLOBAL_PER):
+        self.path = path
+        self.ratelimit = GlobalRateLimit(rate, per)
+        self.server = None
+        self._writers = set()
+
+    async def _handle(self, reader, writer):
+        self._writers.add(writer)
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                command, _, argument = line.strip().partition(b' ')
+
+                if command == b'A':
+                    writer.write(b'%f\n' % self.ratelimit.reserve())
+                elif command == b'B':
+                    self.ratelimit.block(float(argument))
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def start(self):
+        _remove_stale_socket(self.path)
+        self.server = await asyncio.start_unix_server(self._handle, self.path)
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.server is None:
+            return
+
+        self.server.close()
+
+        # wait_closed() also waits for the connected clients
+        for writer in tuple(self._writers):
+            writer.close()
+
+        await self.server.wait_closed()
+        self.server = None
+
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def run_coordinator(path, *args, **kwargs):
+    """Runs a `GlobalRateLimitCoordinator` until interrupted,
+    meant to be the target of its own process"""
+    coordinator = GlobalRateLimitCoordinator(path, *args, **kwargs)
+
+    try:
+        asyncio.run(coordinator.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+class RateLimiter:
+    def __init__(self, global_ratelimit=None):
+        self.buckets = {}
+        self.hashes = {}
+        self._next_sweep = time.monotonic() + BUCKET_SWEEP_INTERVAL
+
+        if global_ratelimit is not None:
+            self.global_ratelimit = global_ratelimit
+        else:
+            self.global_ratelimit = GlobalRateLimit()
+
+    def sweep(self, now=None):
+        # Drops idle buckets, a bucket shared through its hash is
+        # kept under both keys and goes from both
+        if now is None:
+            now = time.monotonic()
+
+        for key, bucket in tuple(self.buckets.items()):
+            if bucket.is_idle(now):
+                del self.buckets[key]
+
+        self._next_sweep = now + BUCKET_SWEEP_INTERVAL
+
+    def get_bucket(self, route, major_parameters=()):
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+        key = (self.hashes.get(route, route), major_parameters)
+
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = RateLimitBucket(key)
+
+        return bucket
+
+    async def acquire(self, bucket, priority=RequestPriority.NORMAL):
+        await bucket.acquire(priority)
+
+        try:
+            await self.global_ratelimit.acquire()
+        except BaseException:
+            bucket.release()
+            raise
+
+    async def close(self):
+        await self.global_ratelimit.close()
+
+    def update(self, route, bucket, response, data=None):
+        headers = response.headers
+
+        bucket_hash = headers.get('X-RateLimit-Bucket')
+        if bucket_hash is not None and bucket.hash is None:
+            bucket.hash = bucket_hash
+            self.hashes[route] = bucket_hash
+
+            major_parameters = bucket.key[1]
+            self.buckets.setdefault((bucket_hash, major_parameters), bucket)
+
+        if response.status_code != 429:
+            bucket.update(headers)
+            return
+
+        retry_after = None
+        if isinstance(data, dict):
+            retry_after = data.get('retry_after')
+
+        if retry_after is None:
+            retry_after = (_get_float(headers, 'Retry-After')
+                           or DEFAULT_RESET_AFTER)
+
+        is_global = headers.get('X-RateLimit-Global', '').lower() == 'true'
+        if is_global or isinstance(data, dict) and data.get('global'):
+            self.global_ratelimit.block(retry_after)
+            bucket.release()
+        else:
+            bucket.block(retry_after)
@@ -1,53 +1,198 @@
-import json
+import asyncio
+import random
+import re
+import time
 from http import HTTPStatus
+from types import MappingProxyType
 
-from httpx import AsyncClient
+from httpx import (AsyncClient, HTTPError as HTTPXError, Limits,
+                   TransportError, USE_CLIENT_DEFAULT)
 
+from .circuitbreaker import CircuitBreakers
+from .exceptions import RestError
+from .ratelimit import MAJOR_PARAMETERS, RateLimiter, RequestPriority
+from .restcache import ResponseCache
+from .restqueue import RequestQueue
+from .reststats import RequestRecord, RestStats
+from .utils import JsonArrayDecoder, json_dumps, json_loads
 
-class HTTPError(Exception):
+
+# How many requests each lane may have in flight, None means no cap
+DEFAULT_LANE_LIMITS = MappingProxyType({
+    RequestPriority.INTERACTIVE: None,
+    RequestPriority.NORMAL: None,
+    RequestPriority.BULK: 5,
+})
+
+JSON_HEADERS = MappingProxyType({'Content-Type': 'application/json'})
+
+# With HTTP/2 every request to discord.com is multiplexed over a
+# couple of long-lived connections instead of a pool of HTTP/1.1 ones
+HTTP2_LIMITS = Limits(max_connections=2, max_keepalive_connections=2,
+                      keepalive_expiry=120)
+
+
+def _is_json(response):
+    content_type = response.headers.get('content-type', '')
+    return content_type.lower() == 'application/json'
+
+
+class HTTPError(RestError):
     def __init__(self, msg, response):
         super().__init__(msg)
         self.response = response
 
 
+_FMT_PATTERN = re.compile(r'%\((\w+)\)s')
+_EMPTY_FMT = MappingProxyType({})
+
+
+def _partial_format(url, fmt):
+    def replace(match):
+        try:
+            return str(fmt[match.group(1)]).replace('%', '%%')
+        except KeyError:
+            return match.group(0)
+    return _FMT_PATTERN.sub(replace, url)
+
+
+class RetryPolicy:
+    """Decides whether a failed request is retried and how long to wait,
+    only methods that are safe to repeat are retried by default
+
+    Arguments:
+        max_retries int: The maximum number of retries per request
+
+        base_delay float: The backoff of the first retry, doubled for
+            every subsequent retry
+
+        max_delay float: The upper bound of the backoff, a longer
+            Retry-After from the server is cut down to it. 429s aren't
+            retried by the policy, they wait out the rate limit
+
+        methods frozenset[str]: The HTTP methods that may be retried
+
+        statuses frozenset[int]: The status codes that are retried
+    """
+    RETRY_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'))
+    RETRY_STATUSES = frozenset((500, 502, 503, 504))
+
+    def __init__(self, max_retries=3, base_delay=0.5, max_delay=30.0,
+                 methods=RETRY_METHODS, statuses=RETRY_STATUSES):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.methods = frozenset(methods)
+        self.statuses = frozenset(statuses)
+
+    def should_retry(self, method, attempt, response=None, exc=None):
+        if attempt >= self.max_retries or method not in self.methods:
+            return False
+
+        if exc is not None:
+            return isinstance(exc, TransportError)
+
+        return response.status_code in self.statuses
+
+    def get_delay(self, attempt, response=None):
+        # Full jitter spreads out clients that failed at the same
+        # moment instead of having them all retry in lockstep
+        delay = random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+        if response is not None:
+            try:
+                retry_after = float(response.headers['Retry-After'])
+            except (KeyError, ValueError):
+                pass
+            else:
+                delay = max(delay, min(retry_after, self.max_delay))
+
+        return delay
+
+
+class HTTPRoute:
+    """An `HTTPEndpoint` compiled against a session's global fmt"""
+    __slots__ = ('endpoint', 'url', 'key', 'major_parameters', 'cache_ttl')
+
+    def __init__(self, endpoint, global_fmt, cache_ttl=None):
+        self.endpoint = endpoint
+        self.url = _partial_format(endpoint.url, global_fmt)
+        self.key = endpoint.route
+        self.major_parameters = endpoint.major_parameters
+        self.cache_ttl = cache_ttl or None
+
+    def ratelimit_key(self, fmt):
+        return (self.key,
+                tuple([fmt[key] for key in self.major_parameters]))
+
+
 class HTTPEndpoint:
-    def __init__(self, method, url, *, params=(), json=(), array=False):
+    def __init__(self, method, url, *, params=(), json=(), array=False,
+                 cache_ttl=None):
         self.method = method
         self.url = url
-        self.params = params
-        self.json = json
+        self.params = frozenset(params)
+        self.json = frozenset(json)
         self.array = array
+        self.cache_ttl = cache_ttl
+        self.route = f'{method} {url}'
+        self.major_parameters = tuple(
+            key for key in MAJOR_PARAMETERS if f'%({key})s' in url)
+
+    def _filter(self, keys, data):
+        if data.keys() <= keys:
+            return data
+        return {k: v for k, v in data.items() if k in keys}
+
+    def filter_json(self, json):
+        # Drops the keys the endpoint doesn't accept
+        if self.array:
+            return [self._filter(self.json, i) for i in json]
+        return self._filter(self.json, json)
 
     def request(self, *, session, params=None, json=None, fast=False,
-                **kwargs):
+                fmt=_EMPTY_FMT, **kwargs):
         if not fast:
             if params is not None:
-                params = {k: v for k, v in params.items() if k in self.params}
+                params = self._filter(self.params, params)
 
             if json is not None:
-                if self.array:
-                    json = [{k: v for k, v in i.items() if k in self.json}
-                            for i in json]
-                else:
-                    json = {k: v for k, v in json.items() if k in self.json}
+                json = self.filter_json(json)
 
-        headers = kwargs.setdefault('headers', {})
-        headers.update(session.global_headers)
+        route = session.routes.get(self)
+        if route is None:
+            route = session.compile_route(self)
 
-        fmt = kwargs.pop('fmt', {})
-        fmt.update(session.global_fmt)
+        if route.cache_ttl is not None:
+            kwargs['cache_ttl'] = route.cache_ttl
 
-        url = self.url % fmt
-        return session.request(self.method, url, params=params, json=json,
+        return session.request(self.method, route.url % fmt,
+                               params=params, json=json,
+                               ratelimit_key=route.ratelimit_key(fmt),
                                **kwargs)
 
+    def stream_array(self, *, session, params=None, fast=False,
+                     fmt=_EMPTY_FMT, **kwargs):
+        if not fast and params is not None:
+            params = self._filter(self.params, params)
+
+        route = session.routes.get(self)
+        if route is None:
+            route = session.compile_route(self)
+
+        return session.stream_array(self.method, route.url % fmt,
+                                    params=params,
+                                    ratelimit_key=route.ratelimit_key(fmt),
+                                    **kwargs)
+
 
 BASE_API_URL = 'https://discord.com/api/%(version)s/'
 
 get_guild_audit_log = HTTPEndpoint(
     'GET',
     BASE_API_URL + 'guilds/%(guild_id)s/audit-logs',
-    params=('user_id', 'action_type', 'before', 'limit'),
+    params=('user_id', 'action_type', 'before', 'after', 'limit'),
 )
 
 get_channel = HTTPEndpoint(
@@ -82,8 +227,8 @@ get_channel_message = HTTPEndpoint(
 create_channel_message = HTTPEndpoint(
     'POST',
     BASE_API_URL + 'channels/%(channel_id)s/messages',
-    json=('content', 'nonce', 'tts', 'embed', 'allowed_mentions',
-          'message_reference'),
+    json=('content', 'nonce', 'tts', 'embed', 'embeds', 'allowed_mentions',
+          'message_reference', 'attachments'),
 )
 
 crosspost_message = HTTPEndpoint(
@@ -136,7 +281,7 @@ delete_message = HTTPEndpoint(
 )
 
 bulk_delete_messages = HTTPEndpoint(
-    'DELETE',
+    'POST',
     BASE_API_URL + 'channels/%(channel_id)s/messages/bulk-delete',
     json=('messages',),
 )
@@ -246,6 +391,7 @@ get_guild = HTTPEndpoint(
 get_guild_preview = HTTPEndpoint(
     'GET',
     BASE_API_URL + 'guilds/%(guild_id)s/preview',
+    cache_ttl=60,
 )
 
 modify_guild = HTTPEndpoint(
@@ -400,6 +546,7 @@ begin_guild_prune = HTTPEndpoint(
 get_guild_voice_regions = HTTPEndpoint(
     'GET',
     BASE_API_URL + 'guilds/%(guild_id)s/regions',
+    cache_ttl=3600,
 )
 
 get_guild_invites = HTTPEndpoint(
@@ -431,17 +578,20 @@ modify_guild_widget_settings = HTTPEndpoint(
 get_guild_widget = HTTPEndpoint(
     'GET',
     BASE_API_URL + 'guilds/%(guild_id)s/widget.json',
+    cache_ttl=60,
 )
 
 get_guild_vanity_url = HTTPEndpoint(
     'GET',
     BASE_API_URL + 'guilds/%(guild_id)s/vanity-url',
+    cache_ttl=300,
 )
 
 get_guild_widget_image = HTTPEndpoint(
     'GET',
     BASE_API_URL + 'guilds/%(guild_id)s/widget.png',
     params=('style',),
+    cache_ttl=300,
 )
 
 get_guild_welcome_screen = HTTPEndpoint(
@@ -471,6 +621,7 @@ get_invite = HTTPEndpoint(
     'GET',
     BASE_API_URL + 'invites/%(invite_code)s',
     params=('with_counts', 'with_expiration'),
+    cache_ttl=60,
 )
 
 delete_invite = HTTPEndpoint(
@@ -585,6 +736,7 @@ get_user_connections = HTTPEndpoint(
 get_voice_regions = HTTPEndpoint(
     'GET',
     BASE_API_URL + 'voice/regions',
+    cache_ttl=3600,
 )
 
 create_webhook = HTTPEndpoint(
@@ -639,8 +791,8 @@ execute_webhook = HTTPEndpoint(
     'POST',
     BASE_API_URL + 'webhooks/%(webhook_id)s/%(webhook_token)s',
     params=('wait',),
-    json=('content', 'username', 'avatar_url', 'tts', 'file', 'embeds',
-          'payload_json', 'allowed_mentions'),
+    json=('content', 'username', 'avatar_url', 'tts', 'embeds',
+          'allowed_mentions', 'attachments'),
 )
 
 execute_slack_webhook = HTTPEndpoint(
@@ -660,7 +812,7 @@ edit_webhook_message = HTTPEndpoint(
     BASE_API_URL
     + 'webhooks/%(webhook_id)s/%(webhook_token)s'
     + '/messages/%(message_id)s',
-    json=('content', 'embeds', 'file', 'payload_json', 'allowed_mentions'),
+    json=('content', 'embeds', 'allowed_mentions', 'attachments'),
 )
 
 delete_webhook_message = HTTPEndpoint(
@@ -699,17 +851,402 @@ class RestSession(AsyncClient):
             'version': self.api_version
         })
 
-        super().__init__(*args, **kwargs)
+        self.ratelimiter = kwargs.pop('ratelimiter', None) or RateLimiter()
+        self.max_ratelimit_retries = kwargs.pop('max_ratelimit_retries', 5)
+
+        self.retry_policy = kwargs.pop('retry_policy', RetryPolicy())
 
-    async def request(self, method, url, *args, **kwargs):
-        response = await super().request(method, url, *args, **kwargs)
-        await response.aclose()
+        self.stats = RestStats()
 
-        data = response.content
+        self.request_queue = RequestQueue(
+            kwargs.pop('max_inflight', None), kwargs.pop('max_queued', None),
+            kwargs.pop('overflow_policy', None))
 
-        content_type = response.headers.get('content-type')
-        if content_type.lower() == 'application/json':
-            data = json.loads(data)
+        lane_limits = {**DEFAULT_LANE_LIMITS,
+                       **kwargs.pop('lane_limits', {})}
+        self.lanes = {priority: asyncio.Semaphore(limit)
+                      for priority, limit in lane_limits.items()
+                      if limit is not None}
+
+        self.routes = {}
+
+        self.coalesce_requests = kwargs.pop('coalesce_requests', True)
+        self._inflight = {}
+
+        self.response_cache = kwargs.pop('response_cache', None)
+        if self.response_cache is True:
+            self.response_cache = ResponseCache()
+
+        self.circuit_breakers = kwargs.pop('circuit_breakers', None)
+        if self.circuit_breakers is True:
+            self.circuit_breakers = CircuitBreakers()
+
+        if self.circuit_breakers is not None:
+            self.circuit_breakers.listener = self._circuit_state_changed
+
+        self.http2 = kwargs.get('http2', False)
+        if self.http2:
+            kwargs.setdefault('limits', HTTP2_LIMITS)
+
+        self.warmup_on_start = kwargs.pop('warmup', self.http2)
+
+        headers = kwargs.pop('headers', {})
+        headers.update(self.global_headers)
+
+        super().__init__(*args, headers=headers, **kwargs)
+
+    def _circuit_state_changed(self, breaker, previous):
+        self.manager.dispatch('circuit_state_change', breaker, previous)
+
+    def _record_outcome(self, breaker, probe, record):
+        # Only server errors, requests that never got a response and
+        # bodies that couldn't be decoded count against a route,
+        # anything else is the caller's fault
+        if (isinstance(record.error, (HTTPXError, OSError))
+                or isinstance(record.error, ValueError)
+                and record.status is not None):
+            breaker.record(True, probe)
+        elif record.status is not None:
+            breaker.record(record.status >= 500, probe)
+        else:
+            breaker.cancel(probe)
+
+    async def warmup(self):
+        # Opens (and for HTTP/2 negotiates) the connection ahead of
+        # the first real request, get_gateway needs no authorization
+        try:
+            await get_gateway.request(session=self)
+        except (RestError, HTTPXError, OSError):
+            pass
+
+    def compile_route(self, endpoint):
+        cache_ttl = None
+        if self.response_cache is not None:
+            cache_ttl = self.response_cache.get_ttl(endpoint)
+
+        route = self.routes[endpoint] = HTTPRoute(
+            endpoint, self.global_fmt, cache_ttl)
+        return route
+
+    async def aclose(self):
+        await super().aclose()
+        await self.ratelimiter.close()
+
+    def _get_request_key(self, method, url, args, kwargs):
+        if (method != 'GET' or args or kwargs.get('json') is not None
+                or not kwargs.keys() <= {'params', 'json', 'ratelimit_key',
+                                         'priority'}):
+            return None
+
+        params = kwargs.get('params')
+        if params:
+            params = tuple(params.items())
+
+        key = (method, url, params)
+
+        try:
+            hash(key)
+        except TypeError:
+            return None
+
+        return key
+
+    async def request(self, method, url, *args, cache_ttl=None, **kwargs):
+        key = self._get_request_key(method, url, args, kwargs)
+
+        cached = (key is not None and cache_ttl is not None
+                  and self.response_cache is not None)
+        if cached:
+            entry = self.response_cache.get_fresh(key)
+            if entry is not None:
+                return entry.data
+
+        if key is None or not self.coalesce_requests:
+            if cached:
+                return await self._cached_request(
+                    method, url, key, cache_ttl, **kwargs)
+            return await self._request(method, url, *args, **kwargs)
+
+        # Identical GETs that are already in flight share one request,
+        # shielded so one caller being cancelled doesn't affect the rest
+        task = self._inflight.get(key)
+        if task is None:
+            if cached:
+                coro = self._cached_request(
+                    method, url, key, cache_ttl, **kwargs)
+            else:
+                coro = self._request(method, url, *args, **kwargs)
+
+            task = asyncio.ensure_future(coro)
+            task.add_done_callback(
+                lambda task: self._inflight.pop(key, None))
+            self._inflight[key] = task
+
+        return await asyncio.shield(task)
+
+    async def stream_array(self, method, url, *args, **kwargs):
+        # Yields the elements of a JSON array response in lists, as
+        # soon as each chunk of the body has been decoded
+        response, data, record, done = await self._open(
+            method, url, *args, stream=True, **kwargs)
+
+        if response.is_closed:
+            done()
+
+            if not isinstance(data, list):
+                raise ValueError(
+                    f'{method} {url} did not respond with a JSON array')
+
+            if data:
+                yield data
+            return
+
+        # The request keeps its slot until the whole body has been read
+        decoder = JsonArrayDecoder()
+        chunks = response.aiter_bytes()
+        error = None
+
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    chunk = await chunks.__anext__()
+                except StopAsyncIteration:
+                    break
+
+                received = time.perf_counter()
+                record.wire += received - started
+                record.bytes_in += len(chunk)
+
+                elements = decoder.feed(chunk)
+                record.decode += time.perf_counter() - received
+
+                if elements:
+                    yield elements
+
+            if not decoder.finished:
+                raise ValueError(f'{method} {url} responded with a '
+                                 f'truncated JSON array')
+        except GeneratorExit:
+            raise
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            await response.aclose()
+            done(error)
+
+    async def _cached_request(self, method, url, key, cache_ttl, **kwargs):
+        entry = self.response_cache.get(key)
+        if entry is not None and entry.etag is not None:
+            kwargs['headers'] = {'If-None-Match': entry.etag}
+
+        response, data = await self._send(method, url, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            self.response_cache.revalidate(entry, cache_ttl)
+            return entry.data
+
+        self.response_cache.store(key, data, cache_ttl,
+                                  response.headers.get('ETag'))
+
+        return data
+
+    async def _request(self, *args, **kwargs):
+        response, data = await self._send(*args, **kwargs)
+        return data
+
+    async def _send(self, *args, **kwargs):
+        response, data, record, done = await self._open(*args, **kwargs)
+        done()
+        return response, data
+
+    async def _open(self, method, url, *args, priority=RequestPriority.NORMAL,
+                    json=None, files=None, **kwargs):
+        # Sends the request and returns it with its record and the
+        # callback that gives back its slots and reports it, which
+        # the caller calls once it is done with the response
+        ratelimit_key = kwargs.get('ratelimit_key')
+        route = (f'{method} {url}' if ratelimit_key is None
+                 else ratelimit_key[0])
+        breaker = None
+        if self.circuit_breakers is not None:
+            breaker = self.circuit_breakers.get(route)
+            probe = breaker.allow()
+
+        record = RequestRecord(route, method, url, priority)
+        lane = self.lanes.get(priority)
+
+        # The lane is waited on first, a request stuck behind its own
+        # lane mustn't hold an in-flight slot other lanes could use
+        started = time.perf_counter()
+        try:
+            if lane is not None:
+                await lane.acquire()
+
+            try:
+                await self.request_queue.acquire(priority)
+            except BaseException:
+                if lane is not None:
+                    lane.release()
+                raise
+        except BaseException:
+            if breaker is not None:
+                breaker.cancel(probe)
+            raise
+        record.queued += time.perf_counter() - started
+
+        opened = []
+
+        def done(error=None):
+            if error is not None:
+                record.error = error
+
+            self.request_queue.release()
+
+            if lane is not None:
+                lane.release()
+
+            for fp in opened:
+                fp.close()
+
+            record.finish()
+            self.stats.add(record)
+
+            if breaker is not None:
+                self._record_outcome(breaker, probe, record)
+
+            self.manager.dispatch('rest_request_complete', record)
+
+        try:
+            if files:
+                # Attachments are streamed from disk or their buffers
+                # in chunks by httpx, the JSON body rides along as
+                # payload_json
+                multipart = []
+
+                for i, file in enumerate(files):
+                    fp, close = file.open()
+                    if close:
+                        opened.append(fp)
+
+                    multipart.append((f'files[{i}]', (
+                        file.filename, fp, file.content_type)))
+
+                kwargs['files'] = multipart
+
+                if json is not None:
+                    kwargs['data'] = {
+                        'payload_json': json_dumps(json).decode()}
+            elif json is not None:
+                # The body is encoded once with the fastest available
+                # codec rather than letting httpx run it through the stdlib
+                kwargs['content'] = json_dumps(json)
+
+                headers = kwargs.get('headers')
+                if headers is None:
+                    kwargs['headers'] = JSON_HEADERS
+                else:
+                    kwargs['headers'] = {**headers, **JSON_HEADERS}
+
+            response, data = await self._send_in_lane(
+                method, url, *args, priority=priority, record=record,
+                **kwargs)
+        except BaseException as exc:
+            done(exc)
+            raise
+
+        return response, data, record, done
+
+    async def _send_in_lane(self, method, url, *args, ratelimit_key=None,
+                            priority=RequestPriority.NORMAL, record,
+                            stream=False, **kwargs):
+        if ratelimit_key is not None:
+            route, major_parameters = ratelimit_key
+        else:
+            route, major_parameters = f'{method} {url}', ()
+
+        # build_request() doesn't take these, they are for send()
+        auth = kwargs.pop('auth', USE_CLIENT_DEFAULT)
+        follow_redirects = kwargs.pop('follow_redirects', USE_CLIENT_DEFAULT)
+
+        retries = 0
+        attempt = 0
+
+        while True:
+            started = time.perf_counter()
+
+            bucket = self.ratelimiter.get_bucket(route, major_parameters)
+            await self.ratelimiter.acquire(bucket, priority)
+
+            sent = time.perf_counter()
+            record.queued += sent - started
+
+            try:
+                response = await self.send(
+                    self.build_request(method, url, *args, **kwargs),
+                    stream=True, auth=auth,
+                    follow_redirects=follow_redirects)
+
+                # Successful JSON responses that are being streamed are
+                # left open for the caller to decode as they arrive
+                if not (stream and response.status_code < 300
+                        and _is_json(response)):
+                    try:
+                        await response.aread()
+                    finally:
+                        await response.aclose()
+            except BaseException as exc:
+                record.wire += time.perf_counter() - sent
+                bucket.release()
+
+                if (self.retry_policy is None
+                        or not self.retry_policy.should_retry(
+                            method, attempt, exc=exc)):
+                    raise
+
+                await asyncio.sleep(self.retry_policy.get_delay(attempt))
+                attempt += 1
+                record.retries += 1
+                continue
+
+            received = time.perf_counter()
+            record.wire += received - sent
+
+            record.status = response.status_code
+            record.bytes_out += int(
+                response.request.headers.get('Content-Length', 0))
+
+            if not response.is_closed:
+                self.ratelimiter.update(route, bucket, response)
+                return response, None
+
+            data = response.content
+            record.bytes_in += len(data)
+
+            if _is_json(response):
+                data = json_loads(data)
+                record.decode += time.perf_counter() - received
+
+            self.ratelimiter.update(route, bucket, response, data)
+
+            if response.status_code == 429:
+                if retries >= self.max_ratelimit_retries:
+                    break
+
+                retries += 1
+                record.retries += 1
+                continue
+
+            if (self.retry_policy is None
+                    or not self.retry_policy.should_retry(
+                        method, attempt, response=response)):
+                break
+
+            await asyncio.sleep(
+                self.retry_policy.get_delay(attempt, response))
+            attempt += 1
+            record.retries += 1
 
         if response.status_code >= 400:
             status = HTTPStatus(response.status_code)
@@ -717,4 +1254,4 @@ class RestSession(AsyncClient):
                 f'{method} {url} responded with {status} {status.phrase}: '
                 f'{data}', response)
 
-        return data
+        return response, data
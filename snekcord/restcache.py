@@ -0,0 +1,85 @@
+import time
+from collections import OrderedDict
+
+__all__ = ('CacheEntry', 'ResponseCache')
+
+
+class CacheEntry:
+    __slots__ = ('data', 'etag', 'expires_at')
+
+    def __init__(self, data, etag, expires_at):
+        self.data = data
+        self.etag = etag
+        self.expires_at = expires_at
+
+    def is_fresh(self):
+        return time.monotonic() < self.expires_at
+
+
+class ResponseCache:
+    """A size-bounded LRU cache for GET responses of endpoints
+    that have a `cache_ttl`, stale entries with an ETag are
+    revalidated with If-None-Match instead of being redownloaded
+
+    Arguments:
+        max_entries int: The maximum number of responses to keep
+
+        ttls dict[HTTPEndpoint, float]: Overrides for the endpoints'
+            default TTLs, a TTL of 0 disables caching for an endpoint
+    """
+
+    def __init__(self, max_entries=1024, ttls=None):
+        self.max_entries = max_entries
+        self.ttls = ttls if ttls is not None else {}
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get_ttl(self, endpoint):
+        return self.ttls.get(endpoint, endpoint.cache_ttl)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def get_fresh(self, key):
+        entry = self.get(key)
+
+        if entry is not None and entry.is_fresh():
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        return None
+
+    def store(self, key, data, ttl, etag=None):
+        self.entries[key] = CacheEntry(data, etag, time.monotonic() + ttl)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def revalidate(self, entry, ttl):
+        self.revalidations += 1
+        entry.expires_at = time.monotonic() + ttl
+
+    def invalidate(self, key):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations,
+            'size': len(self.entries),
+        }
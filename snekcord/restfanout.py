@@ -0,0 +1,125 @@
+import asyncio
+
+from .ratelimit import RequestPriority
+from .rest import JSON_HEADERS, execute_webhook
+from .utils import json_dumps
+
+__all__ = ('WebhookResult', 'execute_webhooks')
+
+DEFAULT_CONCURRENCY = 50
+
+
+class WebhookResult:
+    """The outcome of executing one webhook of a fan-out
+
+    Attributes:
+        webhook_id Snowflake: The id of the webhook
+
+        webhook_token str: The token of the webhook
+
+        data Optional[dict]: The created message if `wait` was passed
+
+        error Optional[Exception]: The exception the request failed with
+    """
+    __slots__ = ('webhook_id', 'webhook_token', 'data', 'error')
+
+    def __init__(self, webhook_id, webhook_token, data=None, error=None):
+        self.webhook_id = webhook_id
+        self.webhook_token = webhook_token
+        self.data = data
+        self.error = error
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(webhook_id={self.webhook_id}, '
+                f'ok={self.ok})')
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+async def execute_webhooks(session, targets, json, *, wait=False,
+                           concurrency=DEFAULT_CONCURRENCY,
+                           priority=RequestPriority.NORMAL):
+    """Executes every webhook in targets with the same payload,
+    yielding a `WebhookResult` for each one as it completes
+
+    Arguments:
+        session RestSession: The session to send the requests with
+
+        targets Iterable[tuple[Snowflake, str]]: The ids and tokens
+            of the webhooks to execute
+
+        json dict: The payload, encoded once and reused for every target
+
+        wait bool: Whether to wait for the messages to be created and
+            return them
+
+        concurrency int: The maximum number of requests in flight
+
+        priority RequestPriority: The lane to send the requests in
+    """
+    body = json_dumps(execute_webhook.filter_json(json))
+    params = {'wait': 'true'} if wait else None
+
+    route = session.routes.get(execute_webhook)
+    if route is None:
+        route = session.compile_route(execute_webhook)
+
+    loop = asyncio.get_running_loop()
+
+    ready = asyncio.Queue()
+    results = asyncio.Queue()
+    timers = []
+
+    for target in targets:
+        ready.put_nowait(target)
+
+    total = ready.qsize()
+
+    def defer(target, delay):
+        # A webhook whose bucket is exhausted is set aside until it
+        # resets instead of holding on to one of the workers
+        timers.append(loop.call_later(delay, ready.put_nowait, target))
+
+    async def worker():
+        while True:
+            target = await ready.get()
+            webhook_id, webhook_token = target
+
+            fmt = {'webhook_id': webhook_id, 'webhook_token': webhook_token}
+
+            bucket = session.ratelimiter.get_bucket(
+                *route.ratelimit_key(fmt))
+            delay = bucket.get_delay()
+            if delay > 0:
+                defer(target, delay)
+                continue
+
+            try:
+                data = await execute_webhook.request(
+                    session=session, fmt=fmt, params=params, fast=True,
+                    content=body, headers=JSON_HEADERS, priority=priority)
+            except Exception as exc:
+                # Anything else would kill the worker and leave the
+                # caller waiting for a result that never comes
+                result = WebhookResult(webhook_id, webhook_token, error=exc)
+            else:
+                result = WebhookResult(webhook_id, webhook_token, data=data)
+
+            results.put_nowait(result)
+
+    workers = [asyncio.ensure_future(worker())
+               for _ in range(min(concurrency, total))]
+
+    try:
+        for _ in range(total):
+            yield await results.get()
+    finally:
+        for timer in timers:
+            timer.cancel()
+
+        for task in workers:
+            task.cancel()
+
+        await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,203 @@
+import asyncio
+import collections
+import enum
+
+from .exceptions import RestError
+from .ratelimit import RequestPriority
+
+__all__ = ('OverflowPolicy', 'QueueFullError', 'RequestDroppedError',
+           'RequestQueue')
+
+
+class OverflowPolicy(enum.Enum):
+    """What happens to a request that arrives when the queue is full
+
+    | Name          | Description                                       |
+    | ------------- | ------------------------------------------------- |
+    | `WAIT`        | The caller waits until there is room in the queue |
+    | `REJECT`      | The request fails with `QueueFullError`           |
+    | `DROP_OLDEST` | The oldest request queued in the lowest lane that |
+    |               | isn't above the request's own fails with          |
+    |               | `RequestDroppedError` to make room                |
+    """
+    WAIT = 'wait'
+    REJECT = 'reject'
+    DROP_OLDEST = 'drop_oldest'
+
+
+class QueueFullError(RestError):
+    def __init__(self, msg, priority):
+        super().__init__(msg)
+        self.priority = priority
+
+
+class RequestDroppedError(QueueFullError):
+    pass
+
+
+class RequestQueue:
+    """Bounds the number of requests a `RestSession` has in flight
+    and the number waiting for a turn, requests are let through in
+    order of priority and arrival
+
+    Arguments:
+        max_inflight Optional[int]: The maximum number of requests
+            in flight, None means no limit
+
+        max_queued Optional[int]: The maximum number of requests
+            waiting for a turn, None means no limit
+
+        policies OverflowPolicy|dict[RequestPriority, OverflowPolicy]:
+            The overflow policy for every lane or for individual lanes,
+            lanes that aren't given one wait
+    """
+
+    def __init__(self, max_inflight=None, max_queued=None, policies=None):
+        self.max_inflight = max_inflight
+        self.max_queued = max_queued
+
+        if isinstance(policies, OverflowPolicy):
+            policies = dict.fromkeys(RequestPriority, policies)
+
+        self.policies = dict.fromkeys(RequestPriority, OverflowPolicy.WAIT)
+        if policies is not None:
+            self.policies.update(policies)
+
+        self.inflight = 0
+        self.queued = 0
+        self.dropped = 0
+        self.rejected = 0
+
+        self._queues = {priority: collections.deque()
+                        for priority in RequestPriority}
+        self._overflow = collections.deque()
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(inflight={self.inflight}, '
+                f'queued={self.queued})')
+
+    def _has_room(self):
+        return self.max_queued is None or self.queued < self.max_queued
+
+    def _enqueue(self, priority, waiter):
+        self._queues[priority].append(waiter)
+        self.queued += 1
+
+    def _grant(self):
+        for queue in self._queues.values():
+            while queue and (self.max_inflight is None
+                             or self.inflight < self.max_inflight):
+                waiter = queue.popleft()
+                self.queued -= 1
+
+                # Cancelled, but its task hasn't had a chance to clean up
+                if waiter.done():
+                    continue
+
+                self.inflight += 1
+                waiter.set_result(None)
+
+    def _wakeup(self):
+        self._grant()
+
+        if self._overflow:
+            # Requests that were waiting for room move into their lanes,
+            # an empty queue always takes one so max_queued=0 can't stall
+            while self._overflow and (self._has_room() or not self.queued):
+                self._enqueue(*self._overflow.popleft())
+
+            self._grant()
+
+    def _discard(self, priority, waiter):
+        try:
+            self._queues[priority].remove(waiter)
+        except ValueError:
+            try:
+                self._overflow.remove((priority, waiter))
+            except ValueError:
+                pass
+        else:
+            self.queued -= 1
+            self._wakeup()
+
+    def _overflowed(self, priority, waiter):
+        policy = self.policies[priority]
+
+        if policy is OverflowPolicy.WAIT:
+            self._overflow.append((priority, waiter))
+            return
+
+        victim = None
+
+        if policy is OverflowPolicy.DROP_OLDEST:
+            # The lowest lane goes first, the request's own lane last
+            for lane in reversed(RequestPriority):
+                if lane < priority:
+                    break
+
+                queue = self._queues[lane]
+                while queue and queue[0].done():
+                    queue.popleft()
+                    self.queued -= 1
+
+                if queue:
+                    victim = lane
+                    break
+
+        if victim is None:
+            self.rejected += 1
+            raise QueueFullError(
+                f'The request queue is full ({self.queued} queued)',
+                priority)
+
+        self.dropped += 1
+        self._queues[victim].popleft().set_exception(RequestDroppedError(
+            'The request was dropped to make room for a newer one',
+            victim))
+        self._queues[priority].append(waiter)
+
+    async def acquire(self, priority=RequestPriority.NORMAL):
+        if not (self.queued or self._overflow) and (
+                self.max_inflight is None
+                or self.inflight < self.max_inflight):
+            self.inflight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+
+        if self._has_room():
+            self._enqueue(priority, waiter)
+        else:
+            self._overflowed(priority, waiter)
+
+        try:
+            await waiter
+        except BaseException:
+            if waiter.cancelled() or not waiter.done():
+                self._discard(priority, waiter)
+            elif waiter.exception() is None:
+                # The turn was handed over just as we were cancelled
+                self.release()
+            raise
+
+    def release(self):
+        self.inflight -= 1
+        self._wakeup()
+
+    def depth(self, priority=None):
+        """Returns the number of requests waiting for a turn in
+        a lane, or in every lane if no priority is given"""
+        if priority is None:
+            return self.queued
+        return len(self._queues[priority])
+
+    def stats(self):
+        return {
+            'inflight': self.inflight,
+            'queued': self.queued,
+            'waiting': len(self._overflow),
+            'depths': {priority.name: len(queue)
+                       for priority, queue in self._queues.items()},
+            'dropped': self.dropped,
+            'rejected': self.rejected,
+        }
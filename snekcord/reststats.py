@@ -0,0 +1,198 @@
+import bisect
+import collections
+import time
+
+__all__ = ('LATENCY_BUCKETS', 'Histogram', 'RollingHistogram',
+           'RequestRecord', 'RouteStats', 'RestStats')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, float('inf'))
+
+
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'count', 'total')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    @property
+    def mean(self):
+        if not self.count:
+            return 0.0
+        return self.total / self.count
+
+    def quantile(self, q):
+        # Returns the upper bound of the bucket the quantile falls in
+        if not self.count:
+            return 0.0
+
+        target = q * self.count
+        seen = 0
+
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+
+        return self.bounds[-1]
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip(self.bounds, self.counts)),
+        }
+
+
+class RollingHistogram(Histogram):
+    """A `Histogram` that only counts the last `size` samples
+
+    Attributes:
+        samples deque[float]: The samples currently counted, oldest first
+    """
+    __slots__ = ('samples',)
+
+    def __init__(self, size=100, bounds=LATENCY_BUCKETS):
+        super().__init__(bounds)
+        self.samples = collections.deque(maxlen=size)
+
+    def add(self, value):
+        if len(self.samples) == self.samples.maxlen:
+            oldest = self.samples[0]
+            self.counts[bisect.bisect_left(self.bounds, oldest)] -= 1
+            self.count -= 1
+            self.total -= oldest
+
+        self.samples.append(value)
+        super().add(value)
+
+
+class RequestRecord:
+    """The timings of a single request sent by a `RestSession`
+
+    Attributes:
+        route str: The route of the endpoint that was requested
+
+        status Optional[int]: The final status code, None if the
+            request failed without a response
+
+        error Optional[BaseException]: The exception the request failed with
+
+        queued float: Seconds spent waiting on lanes and rate limits
+
+        wire float: Seconds spent sending requests and reading responses
+
+        decode float: Seconds spent decoding JSON responses
+
+        retries int: How many times the request was resent
+    """
+    __slots__ = ('route', 'method', 'url', 'priority', 'status', 'error',
+                 'bytes_in', 'bytes_out', 'queued', 'wire', 'decode',
+                 'retries', 'started_at', 'elapsed')
+
+    def __init__(self, route, method, url, priority):
+        self.route = route
+        self.method = method
+        self.url = url
+        self.priority = priority
+        self.status = None
+        self.error = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.queued = 0.0
+        self.wire = 0.0
+        self.decode = 0.0
+        self.retries = 0
+        self.started_at = time.perf_counter()
+        self.elapsed = None
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(method={self.method!r}, '
+                f'url={self.url!r}, status={self.status}, '
+                f'elapsed={self.elapsed})')
+
+    @property
+    def status_class(self):
+        if self.status is None:
+            return 'error'
+        return f'{self.status // 100}xx'
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started_at
+
+
+class RouteStats:
+    __slots__ = ('route', 'count', 'statuses', 'bytes_in', 'bytes_out',
+                 'retries', 'latency', 'queued', 'wire', 'decode')
+
+    def __init__(self, route):
+        self.route = route
+        self.count = 0
+        self.statuses = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.retries = 0
+        self.latency = Histogram()
+        self.queued = Histogram()
+        self.wire = Histogram()
+        self.decode = Histogram()
+
+    def add(self, record):
+        self.count += 1
+
+        status_class = record.status_class
+        self.statuses[status_class] = self.statuses.get(status_class, 0) + 1
+
+        self.bytes_in += record.bytes_in
+        self.bytes_out += record.bytes_out
+        self.retries += record.retries
+
+        self.latency.add(record.elapsed)
+        self.queued.add(record.queued)
+        self.wire.add(record.wire)
+        self.decode.add(record.decode)
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'statuses': dict(self.statuses),
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'retries': self.retries,
+            'latency': self.latency.to_dict(),
+            'queued': self.queued.to_dict(),
+            'wire': self.wire.to_dict(),
+            'decode': self.decode.to_dict(),
+        }
+
+
+class RestStats:
+    def __init__(self):
+        self.routes = {}
+
+    def add(self, record):
+        stats = self.routes.get(record.route)
+        if stats is None:
+            stats = self.routes[record.route] = RouteStats(record.route)
+
+        stats.add(record)
+
+    def get(self, route):
+        # Accepts an HTTPEndpoint as well as a route key
+        return self.routes.get(getattr(route, 'route', route))
+
+    def snapshot(self):
+        return {route: stats.to_dict() for route, stats in self.routes.items()}
+
+    def reset(self):
+        self.routes.clear()
@@ -0,0 +1,258 @@
+import asyncio
+import random
+import time
+
+from wsaio import WebSocketCloseCode, WsaioError
+
+from . import rest
+from .utils import EventDispatcher
+from .ws.shardws import Shard, ShardCloseCode
+
+__all__ = ('IDENTIFY_INTERVAL', 'FATAL_CLOSE_CODES', 'IdentifyLimiter',
+           'Sharder')
+
+IDENTIFY_INTERVAL = 5.0
+
+RECONNECT_BACKOFF = 1.0
+RECONNECT_BACKOFF_MAX = 60.0
+
+# Reconnecting after these would just get the shard closed again
+FATAL_CLOSE_CODES = frozenset((
+    ShardCloseCode.AUTHENTICATION_FAILED,
+    ShardCloseCode.INVALID_SHARD,
+    ShardCloseCode.SHARDING_REQUIRED,
+    ShardCloseCode.INVALID_API_VERSION,
+    ShardCloseCode.INVALID_INTENTS,
+    ShardCloseCode.DISALLOWED_INTENTS,
+))
+
+
+class IdentifyLimiter:
+    """Spaces out IDENTIFYs the way Discord requires, shard `i` identifies
+    in bucket `i % max_concurrency` and every bucket allows one IDENTIFY
+    per `interval` seconds
+
+    Arguments:
+        max_concurrency int: The number of buckets
+
+        remaining Optional[int]: How many sessions can still be started
+            before `reset_after`, unlimited if None
+
+        reset_after float: Seconds until `remaining` is reset to `total`
+
+        total Optional[int]: The number of sessions allowed per reset
+    """
+
+    def __init__(self, max_concurrency=1, *, remaining=None, reset_after=0.0,
+                 total=None, interval=IDENTIFY_INTERVAL):
+        self.max_concurrency = max_concurrency
+        self.interval = interval
+        self.remaining = remaining
+        self.total = total if total is not None else remaining
+        self.reset_at = time.monotonic() + reset_after
+
+        self._next = {}
+        self._locks = {}
+
+    def get_bucket(self, shard_id):
+        return shard_id % self.max_concurrency
+
+    def get_delay(self, shard_id):
+        next_at = self._next.get(self.get_bucket(shard_id))
+        if next_at is None:
+            return 0.0
+        return max(next_at - time.monotonic(), 0.0)
+
+    async def wait(self, shard_id):
+        # Waits for the shard's bucket without taking its slot
+        delay = self.get_delay(shard_id)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _wait_for_sessions(self):
+        if self.remaining is None:
+            return
+
+        now = time.monotonic()
+        if now >= self.reset_at and self.total is not None:
+            self.remaining = self.total
+            self.reset_at = now + 24 * 60 * 60
+
+        if self.remaining <= 0:
+            await asyncio.sleep(self.reset_at - now)
+            self.remaining = self.total
+            self.reset_at = time.monotonic() + 24 * 60 * 60
+
+        self.remaining -= 1
+
+    async def acquire(self, shard_id):
+        bucket = self.get_bucket(shard_id)
+
+        lock = self._locks.get(bucket)
+        if lock is None:
+            lock = self._locks[bucket] = asyncio.Lock()
+
+        async with lock:
+            await self.wait(shard_id)
+            await self._wait_for_sessions()
+            self._next[bucket] = time.monotonic() + self.interval
+
+
+class Sharder(EventDispatcher):
+    """Runs a manager's gateway shards, starting them as fast as
+    the session start limit allows and reconnecting them when
+    they are disconnected
+
+    Arguments:
+        manager BaseManager: The manager events are dispatched to
+
+        shard_ids Optional[Iterable[int]]: The shards to run in this
+            process, all of them by default
+
+        shard_count Optional[int]: The total number of shards,
+            Discord's recommendation by default
+
+        intents int: The gateway intents to identify with
+
+        cluster Optional[ClusterClient]: The cluster this process is a
+            worker of, IDENTIFYs are then spaced out across the cluster
+
+        compress bool: Whether to use `zlib-stream` transport compression
+
+        encoding str: The gateway encoding, `json` or `etf`
+
+        shard_encodings Optional[dict[int, str]]: Per-shard overrides
+            for `encoding`
+    """
+
+    def __init__(self, manager, *, shard_ids=None, shard_count=None,
+                 intents=0, cluster=None, compress=True, encoding='json',
+                 shard_encodings=None):
+        super().__init__(loop=manager.loop)
+        self.manager = manager
+        self.manager.subscribe(self)
+
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.intents = intents
+        self.cluster = cluster
+        self.compress = compress
+        self.encoding = encoding
+        self.shard_encodings = shard_encodings or {}
+
+        self.gateway_url = None
+        self.identify_limiter = None
+        self.shards = {}
+
+        self._tasks = []
+        self._closing = False
+
+    def dispatch(self, name, *args):
+        super().dispatch(name.lower(), *args)
+
+    async def fetch_gateway(self):
+        data = await rest.get_gateway_bot.request(session=self.manager.rest)
+
+        self.gateway_url = data['url']
+
+        if self.shard_count is None:
+            self.shard_count = data['shards']
+
+        if self.cluster is not None:
+            create_limiter = self.cluster.create_identify_limiter
+        else:
+            create_limiter = IdentifyLimiter
+
+        limit = data['session_start_limit']
+        self.identify_limiter = create_limiter(
+            limit.get('max_concurrency', 1),
+            remaining=limit.get('remaining'),
+            reset_after=limit.get('reset_after', 0) / 1000,
+            total=limit.get('total'))
+
+        return data
+
+    def get_encoding(self, shard_id):
+        return self.shard_encodings.get(shard_id, self.encoding)
+
+    def get_gateway_url(self, shard):
+        version = self.manager.api_version[1:]
+        url = f'{self.gateway_url}?v={version}&encoding={shard.encoding}'
+
+        if self.compress:
+            url += '&compress=zlib-stream'
+
+        return url
+
+    async def start(self):
+        # Returns once every shard has sent its first IDENTIFY
+        await self.fetch_gateway()
+
+        if self.shard_ids is None:
+            self.shard_ids = range(self.shard_count)
+
+        buckets = {}
+        for shard_id in self.shard_ids:
+            shard = self.shards[shard_id] = Shard(self, shard_id)
+            bucket = self.identify_limiter.get_bucket(shard_id)
+            buckets.setdefault(bucket, []).append(shard)
+
+        await asyncio.gather(*(self._launch(shards)
+                               for shards in buckets.values()))
+
+    async def _launch(self, shards):
+        # Shards in the same bucket take turns, so don't open the
+        # next connection until the previous shard has identified
+        for shard in shards:
+            await self.identify_limiter.wait(shard.id)
+            self._tasks.append(
+                self.loop.create_task(self._supervise(shard)))
+            await shard.identified.wait()
+
+    async def _supervise(self, shard):
+        attempt = 0
+
+        while not self._closing:
+            try:
+                await shard.start(self.get_gateway_url(shard))
+            except (OSError, asyncio.TimeoutError, WsaioError):
+                pass
+            finally:
+                # Let the bucket move on even if the shard never got
+                # as far as identifying
+                shard.identified.set()
+
+            if self._closing:
+                break
+
+            if shard.close_code in FATAL_CLOSE_CODES:
+                self.dispatch('shard_fatal', shard, shard.close_code)
+                break
+
+            if shard.ready:
+                attempt = 0
+
+            delay = min(RECONNECT_BACKOFF * 2 ** attempt,
+                        RECONNECT_BACKOFF_MAX)
+            attempt += 1
+
+            self.dispatch('shard_reconnect', shard, shard.close_code)
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+    async def close(self):
+        self._closing = True
+
+        for shard in self.shards.values():
+            if shard.transport is None:
+                continue
+
+            try:
+                await shard.close(WebSocketCloseCode.NORMAL_CLOSURE)
+            except (OSError, WsaioError):
+                pass
+
+        for task in self._tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
@@ -1,3 +1,4 @@
+from .auditlogstate import *
 from .basestate import *
 from .channelstate import *
 from .emojistate import *
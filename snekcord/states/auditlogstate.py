@@ -0,0 +1,160 @@
+import asyncio
+
+from .basestate import BaseState
+from .. import rest
+from ..objects.auditlogobject import AuditLogEntry
+from ..utils import Snowflake
+
+__all__ = ('AuditLogState',)
+
+AUDIT_LOG_PAGE_LIMIT = 100
+DEFAULT_TAIL_INTERVAL = 5.0
+
+
+class AuditLogState(BaseState):
+    __key_transformer__ = Snowflake.try_snowflake
+    __audit_log_entry_class__ = AuditLogEntry
+
+    def __init__(self, *, manager, guild):
+        super().__init__(manager=manager)
+        self.guild = guild
+        self.cursor = None
+
+    def upsert(self, data):
+        entry = self.get(data['id'])
+        if entry is not None:
+            entry.update(data)
+        else:
+            entry = self.__audit_log_entry_class__.unmarshal(
+                data, state=self)
+            entry.cache()
+
+        return entry
+
+    def _upsert_related(self, data):
+        users = data.get('users')
+        if users is not None:
+            self.manager.users.upsert_many(users)
+
+    async def _fetch_page(self, params):
+        data = await rest.get_guild_audit_log.request(
+            session=self.manager.rest,
+            fmt=dict(guild_id=self.guild.id),
+            params=params)
+
+        self._upsert_related(data)
+
+        return data['audit_log_entries']
+
+    async def fetch_many(self, *, user=None, action_type=None, before=None,
+                         after=None, limit=None):
+        params = {}
+
+        if user is not None:
+            params['user_id'] = Snowflake.try_snowflake(user)
+
+        if action_type is not None:
+            params['action_type'] = int(action_type)
+
+        if before is not None:
+            params['before'] = Snowflake.try_snowflake(before)
+
+        if after is not None:
+            params['after'] = Snowflake.try_snowflake(after)
+
+        if limit is not None:
+            params['limit'] = int(limit)
+
+        entries = await self._fetch_page(params)
+
+        return self.upsert_many(entries)
+
+    async def _fetch_since(self, cursor, params):
+        # Everything newer than the cursor, a full page means there may
+        # be more so keep walking back from the oldest entry seen until
+        # the gap to the cursor is closed
+        params = {**params, 'after': cursor, 'limit': AUDIT_LOG_PAGE_LIMIT}
+        entries = {}
+
+        while True:
+            page = await self._fetch_page(params)
+
+            for data in page:
+                entry_id = int(data['id'])
+                if entry_id > cursor:
+                    entries[entry_id] = data
+
+            if len(page) < AUDIT_LOG_PAGE_LIMIT or not entries:
+                break
+
+            oldest = min(entries)
+            if params.get('before') == oldest:
+                break
+
+            params['before'] = oldest
+
+        return [entries[entry_id] for entry_id in sorted(entries)]
+
+    async def tail(self, *, after=None, user=None, action_type=None,
+                   interval=DEFAULT_TAIL_INTERVAL, store=None, cache=False):
+        """Polls the audit log forever, yielding new entries oldest first
+
+        Arguments:
+            after Optional[SnowflakeConvertible]: The entry (or time as a
+                snowflake) to start after, defaults to the saved cursor
+                or the current time
+
+            user Optional[SnowflakeConvertible]: Only yield entries
+                for actions taken by this user
+
+            action_type Optional[int]: Only yield entries of this type
+
+            interval float: The number of seconds between polls
+
+            store Optional[MutableMapping[str, int]]: Where to save the
+                cursor after every entry, keyed by guild id, e.g. a
+                `shelve.Shelf` so restarts resume where they left off
+
+            cache bool: Whether to cache the yielded entries
+        """
+        key = str(self.guild.id)
+
+        if after is not None:
+            self.cursor = Snowflake.try_snowflake(after)
+        elif store is not None and key in store:
+            self.cursor = Snowflake(store[key])
+        elif self.cursor is None:
+            self.cursor = Snowflake.build()
+
+        params = {}
+
+        if user is not None:
+            params['user_id'] = Snowflake.try_snowflake(user)
+
+        if action_type is not None:
+            params['action_type'] = int(action_type)
+
+        while True:
+            entries = await self._fetch_since(self.cursor, params)
+
+            for data in entries:
+                if cache:
+                    entry = self.upsert(data)
+                else:
+                    entry = self.get(data['id'])
+                    if entry is not None:
+                        entry.update(data)
+                    else:
+                        entry = self.__audit_log_entry_class__.unmarshal(
+                            data, state=self)
+
+                self.cursor = entry.id
+                if store is not None:
+                    store[key] = int(self.cursor)
+
+                yield entry
+
+            # A full page might not have been everything, so look
+            # again straight away instead of waiting for the next poll
+            if len(entries) < AUDIT_LOG_PAGE_LIMIT:
+                await asyncio.sleep(interval)
@@ -118,11 +118,14 @@ class GuildBanState(BaseState):
         return self.upsert(data)
 
     async def fetch_all(self):
-        data = await rest.get_guild_bans.request(
-            session=self.manager.rest,
-            fmt=dict(guild_id=self.guild.id))
+        bans = []
 
-        return self.upsert_many(data)
+        async for data in rest.get_guild_bans.stream_array(
+                session=self.manager.rest,
+                fmt=dict(guild_id=self.guild.id)):
+            bans.extend(self.upsert_many(data))
+
+        return bans
 
     async def add(self, user, **kwargs):
         keys = rest.create_guild_ban.json
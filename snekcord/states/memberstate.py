@@ -1,5 +1,8 @@
+import asyncio
+
 from .basestate import BaseState
 from .. import rest
+from ..ratelimit import RequestPriority
 from ..objects.memberobject import GuildMember
 from ..utils import Snowflake, _validate_keys
 
@@ -15,7 +18,7 @@ class GuildMemberState(BaseState):
         self.guild = guild
 
     def upsert(self, data):
-        member = self.get(data['id'])
+        member = self.get(data['user']['id'])
         if member is not None:
             member.update(data)
         else:
@@ -47,12 +50,69 @@ class GuildMemberState(BaseState):
         if limit is not None:
             params['limit'] = int(limit)
 
-        data = await rest.get_guild_members.request(
+        members = []
+
+        async for data in rest.get_guild_members.stream_array(
+                session=self.manager.rest,
+                fmt=dict(guild_id=self.guild.id),
+                params=params):
+            members.extend(self.upsert_many(data))
+
+        return members
+
+    def _fetch_page(self, after, limit):
+        params = {'limit': limit}
+
+        if after is not None:
+            params['after'] = after
+
+        return asyncio.ensure_future(rest.get_guild_members.request(
             session=self.manager.rest,
             fmt=dict(guild_id=self.guild.id),
-            params=params)
+            params=params,
+            priority=RequestPriority.BULK))
 
-        return self.upsert_many(data)
+    async def fetch_all(self, *, after=None, limit=None, chunk_size=100):
+        if after is not None:
+            after = Snowflake.try_snowflake(after)
+
+        remaining = limit
+        page_limit = 1000 if remaining is None else min(remaining, 1000)
+
+        if page_limit <= 0:
+            return
+
+        task = self._fetch_page(after, page_limit)
+
+        try:
+            while task is not None:
+                page = await task
+                task = None
+
+                exhausted = len(page) < page_limit
+
+                if remaining is not None:
+                    remaining -= len(page)
+                    exhausted = exhausted or remaining <= 0
+
+                if not exhausted:
+                    # Members are sorted by user id, the next page
+                    # downloads while this one is being upserted
+                    after = max(int(data['user']['id']) for data in page)
+                    page_limit = (1000 if remaining is None
+                                  else min(remaining, 1000))
+                    task = self._fetch_page(after, page_limit)
+
+                for i in range(0, len(page), chunk_size):
+                    for data in page[i:i + chunk_size]:
+                        yield self.upsert(data)
+
+                    # Let the event loop breathe (heartbeats, dispatches)
+                    # between chunks of a large page
+                    await asyncio.sleep(0)
+        finally:
+            if task is not None:
+                task.cancel()
 
     async def search(self, query, limit=None):
         params = {'query': query}
@@ -1,10 +1,20 @@
+import asyncio
+import time
+
 from .basestate import BaseState
 from .. import rest
+from ..ratelimit import RequestPriority
 from ..objects.messageobject import Message
 from ..utils import Snowflake, _validate_keys
 
 __all__ = ('MessageState',)
 
+BULK_DELETE_LIMIT = 100
+# Discord rejects bulk deletes of messages older than two weeks, leave
+# some headroom for messages that age out while the purge is running
+BULK_DELETE_MAX_AGE = 60 * 60 * 24 * 14 - 60 * 10
+BULK_DELETE_CONCURRENCY = 5
+
 
 class MessageState(BaseState):
     __key_transformer__ = Snowflake.try_snowflake
@@ -49,35 +59,210 @@ class MessageState(BaseState):
         if limit is not None:
             params['limit'] = limit
 
-        data = await rest.get_channel_messages.request(
+        messages = []
+
+        async for data in rest.get_channel_messages.stream_array(
+                session=self.manager.rest,
+                fmt=dict(channel_id=self.channel.id),
+                params=params):
+            messages.extend(self.upsert_many(data))
+
+        return messages
+
+    def _fetch_history_page(self, cursor, direction, limit):
+        params = {'limit': limit}
+
+        if cursor is not None:
+            params[direction] = cursor
+
+        return asyncio.ensure_future(rest.get_channel_messages.request(
             session=self.manager.rest,
             fmt=dict(channel_id=self.channel.id),
-            params=params)
+            params=params,
+            priority=RequestPriority.BULK))
+
+    async def history(self, *, before=None, after=None, limit=None,
+                      cache=False):
+        if before is None and after is not None:
+            direction = 'after'
+            cursor = Snowflake.try_snowflake(after)
+            boundary = None
+        else:
+            direction = 'before'
+            cursor = None if before is None else Snowflake.try_snowflake(
+                before)
+            boundary = None if after is None else Snowflake.try_snowflake(
+                after)
+
+        remaining = limit
+        page_limit = 100 if remaining is None else min(remaining, 100)
+
+        if page_limit <= 0:
+            return
 
-        return self.upsert_many(data)
+        task = self._fetch_history_page(cursor, direction, page_limit)
+
+        try:
+            while task is not None:
+                page = await task
+                task = None
+
+                exhausted = len(page) < page_limit
+
+                page.sort(key=lambda data: int(data['id']),
+                          reverse=direction == 'before')
+
+                if boundary is not None:
+                    length = len(page)
+                    page = [data for data in page
+                            if int(data['id']) > boundary]
+                    exhausted = exhausted or len(page) < length
+
+                if remaining is not None:
+                    remaining -= len(page)
+                    exhausted = exhausted or remaining <= 0
+
+                if not exhausted:
+                    cursor = page[-1]['id']
+                    page_limit = (100 if remaining is None
+                                  else min(remaining, 100))
+                    task = self._fetch_history_page(
+                        cursor, direction, page_limit)
+
+                # Messages that aren't already cached are left uncached
+                # unless asked for, so walking a huge channel doesn't
+                # hold every message in memory
+                for data in page:
+                    if cache:
+                        yield self.upsert(data)
+                        continue
+
+                    message = self.get(data['id'])
+                    if message is not None:
+                        message.update(data)
+                    else:
+                        message = self.__message_class__.unmarshal(
+                            data, state=self)
+
+                    yield message
+        finally:
+            if task is not None:
+                task.cancel()
 
     async def create(self, **kwargs):
         keys = rest.create_channel_message.json
 
+        files = kwargs.pop('files', None)
+
         try:
             kwargs['embed'] = kwargs['embed'].to_dict()
         except KeyError:
             pass
 
+        try:
+            kwargs['embeds'] = [embed.to_dict() for embed in kwargs['embeds']]
+        except KeyError:
+            pass
+
         _validate_keys(f'{self.__class__.__name__}.create',
                        kwargs, (), keys)
 
         data = await rest.create_channel_message.request(
             session=self.manager.rest,
             fmt=dict(channel_id=self.channel.id),
-            json=kwargs)
+            json=kwargs,
+            files=files,
+            priority=RequestPriority.INTERACTIVE)
 
         return self.upsert(data)
 
-    async def bulk_delete(self, messages):
-        message_ids = tuple(Snowflake.try_snowflake_set(messages))
+    def _plan_bulk_delete(self, message_ids):
+        # Splits message ids into batches that can be bulk deleted and
+        # ids that have to be deleted one by one, oldest first so the
+        # messages closest to the age limit are deleted before they
+        # cross it
+        cutoff = time.time() - BULK_DELETE_MAX_AGE
 
-        await rest.bulk_delete_messages.request(
-            session=self.manager.rest,
-            fmt=dict(channel_id=self.id),
-            json=dict(messages=message_ids))
+        recent = []
+        old = []
+
+        for message_id in sorted(message_ids):
+            if Snowflake(message_id).timestamp > cutoff:
+                recent.append(message_id)
+            else:
+                old.append(message_id)
+
+        batches = [recent[i:i + BULK_DELETE_LIMIT]
+                   for i in range(0, len(recent), BULK_DELETE_LIMIT)]
+
+        if batches and len(batches[-1]) < 2:
+            old.extend(batches.pop())
+
+        return batches, old
+
+    async def bulk_delete(self, messages, *, progress=None,
+                          concurrency=BULK_DELETE_CONCURRENCY):
+        message_ids = Snowflake.try_snowflake_set(messages)
+        batches, old = self._plan_bulk_delete(message_ids)
+
+        total = len(message_ids)
+        deleted = 0
+
+        def advance(count):
+            nonlocal deleted
+            deleted += count
+            if progress is not None:
+                progress(deleted, total)
+
+        async def delete_message(message_id):
+            try:
+                await rest.delete_message.request(
+                    session=self.manager.rest,
+                    fmt=dict(channel_id=self.channel.id,
+                             message_id=message_id),
+                    priority=RequestPriority.BULK)
+            except rest.HTTPError as exc:
+                # The message is already gone
+                if exc.response.status_code != 404:
+                    raise
+
+            advance(1)
+
+        async def delete_batch(batch):
+            try:
+                await rest.bulk_delete_messages.request(
+                    session=self.manager.rest,
+                    fmt=dict(channel_id=self.channel.id),
+                    json=dict(messages=batch),
+                    priority=RequestPriority.BULK)
+            except rest.HTTPError as exc:
+                # Some of the messages crossed the age limit after all
+                if exc.response.status_code != 400:
+                    raise
+
+                for message_id in batch:
+                    await delete_message(message_id)
+            else:
+                advance(len(batch))
+
+        async def worker(jobs, delete):
+            while jobs:
+                await delete(jobs.pop())
+
+        # Bulk and single deletes are rate limited separately,
+        # so both kinds are sent side by side
+        batches.reverse()
+        old.reverse()
+
+        workers = [
+            *(asyncio.ensure_future(worker(batches, delete_batch))
+              for _ in range(min(concurrency, len(batches)))),
+            *(asyncio.ensure_future(worker(old, delete_message))
+              for _ in range(min(concurrency, len(old)))),
+        ]
+
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
@@ -0,0 +1,266 @@
+import struct
+import zlib
+
+__all__ = ('ETF_VERSION', 'EtfError', 'etf_loads', 'etf_dumps')
+
+ETF_VERSION = 131
+
+NEW_FLOAT_EXT = 70
+COMPRESSED = 80
+SMALL_INTEGER_EXT = 97
+INTEGER_EXT = 98
+FLOAT_EXT = 99
+ATOM_EXT = 100
+SMALL_TUPLE_EXT = 104
+LARGE_TUPLE_EXT = 105
+NIL_EXT = 106
+STRING_EXT = 107
+LIST_EXT = 108
+BINARY_EXT = 109
+SMALL_BIG_EXT = 110
+LARGE_BIG_EXT = 111
+SMALL_ATOM_EXT = 115
+MAP_EXT = 116
+ATOM_UTF8_EXT = 118
+SMALL_ATOM_UTF8_EXT = 119
+
+_ATOMS = {'nil': None, 'true': True, 'false': False}
+
+_int32 = struct.Struct('>i')
+_uint32 = struct.Struct('>I')
+_uint16 = struct.Struct('>H')
+_double = struct.Struct('>d')
+
+_unpack_int32 = _int32.unpack_from
+_unpack_uint32 = _uint32.unpack_from
+_unpack_uint16 = _uint16.unpack_from
+_unpack_double = _double.unpack_from
+
+
+class EtfError(ValueError):
+    pass
+
+
+def _atom(name):
+    try:
+        return _ATOMS[name]
+    except KeyError:
+        return name
+
+
+def _decode(data, position):
+    # Returns the term starting at position and the position after it,
+    # the tags are checked roughly in the order gateway payloads use them
+    tag = data[position]
+    position += 1
+
+    if tag == BINARY_EXT:
+        length, = _unpack_uint32(data, position)
+        position += 4
+        end = position + length
+        return data[position:end].decode(), end
+
+    if tag == SMALL_ATOM_UTF8_EXT:
+        end = position + 1 + data[position]
+        return _atom(data[position + 1:end].decode()), end
+
+    if tag == MAP_EXT:
+        arity, = _unpack_uint32(data, position)
+        position += 4
+
+        value = {}
+        for _ in range(arity):
+            # Keys are nearly always atoms or binaries, skip the call
+            key_tag = data[position]
+            if key_tag == SMALL_ATOM_UTF8_EXT or key_tag == SMALL_ATOM_EXT:
+                end = position + 2 + data[position + 1]
+                key = data[position + 2:end].decode()
+                position = end
+            elif key_tag == BINARY_EXT:
+                end = position + 5 + _unpack_uint32(data, position + 1)[0]
+                key = data[position + 5:end].decode()
+                position = end
+            else:
+                key, position = _decode(data, position)
+
+            value[key], position = _decode(data, position)
+
+        return value, position
+
+    if tag == SMALL_INTEGER_EXT:
+        return data[position], position + 1
+
+    if tag == SMALL_BIG_EXT:
+        length = data[position]
+        sign = data[position + 1]
+        position += 2
+        end = position + length
+
+        value = int.from_bytes(data[position:end], 'little')
+        return -value if sign else value, end
+
+    if tag == INTEGER_EXT:
+        return _unpack_int32(data, position)[0], position + 4
+
+    if tag == NIL_EXT:
+        return [], position
+
+    if tag == LIST_EXT:
+        length, = _unpack_uint32(data, position)
+        position += 4
+
+        value = []
+        for _ in range(length):
+            item, position = _decode(data, position)
+            value.append(item)
+
+        if data[position] == NIL_EXT:
+            position += 1
+        else:
+            # Improper lists never come from Discord, keep the tail
+            tail, position = _decode(data, position)
+            value.append(tail)
+
+        return value, position
+
+    if tag == ATOM_UTF8_EXT or tag == ATOM_EXT:
+        length, = _unpack_uint16(data, position)
+        position += 2
+        end = position + length
+        encoding = 'utf-8' if tag == ATOM_UTF8_EXT else 'latin-1'
+        return _atom(data[position:end].decode(encoding)), end
+
+    if tag == SMALL_ATOM_EXT:
+        end = position + 1 + data[position]
+        return _atom(data[position + 1:end].decode('latin-1')), end
+
+    if tag == NEW_FLOAT_EXT:
+        return _unpack_double(data, position)[0], position + 8
+
+    if tag == STRING_EXT:
+        length, = _unpack_uint16(data, position)
+        position += 2
+        end = position + length
+        return data[position:end].decode('latin-1'), end
+
+    if tag == SMALL_TUPLE_EXT or tag == LARGE_TUPLE_EXT:
+        if tag == SMALL_TUPLE_EXT:
+            arity = data[position]
+            position += 1
+        else:
+            arity, = _unpack_uint32(data, position)
+            position += 4
+
+        value = []
+        for _ in range(arity):
+            item, position = _decode(data, position)
+            value.append(item)
+
+        return tuple(value), position
+
+    if tag == LARGE_BIG_EXT:
+        length, = _unpack_uint32(data, position)
+        sign = data[position + 4]
+        position += 5
+        end = position + length
+
+        value = int.from_bytes(data[position:end], 'little')
+        return -value if sign else value, end
+
+    if tag == FLOAT_EXT:
+        end = position + 31
+        return float(data[position:end].rstrip(b'\x00')), end
+
+    raise EtfError(f'Unsupported ETF tag {tag} at position {position - 1}')
+
+
+def etf_loads(data):
+    """Decodes an Erlang External Term Format payload, binaries are
+    decoded as str and integers, including snowflakes, are left as int
+    """
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+
+    if not data or data[0] != ETF_VERSION:
+        raise EtfError('Missing ETF version byte')
+
+    try:
+        if data[1] == COMPRESSED:
+            data = zlib.decompress(data[6:])
+            value, position = _decode(data, 0)
+        else:
+            value, position = _decode(data, 1)
+    except (IndexError, struct.error, UnicodeDecodeError,
+            zlib.error) as exc:
+        raise EtfError(f'Malformed ETF payload: {exc}') from exc
+
+    if position > len(data):
+        raise EtfError('Truncated ETF payload')
+
+    if position < len(data):
+        raise EtfError('Data after the end of the term')
+
+    return value
+
+
+def _encode(obj, buffer):
+    if obj is None:
+        buffer += b'w\x03nil'
+    elif obj is True:
+        buffer += b'w\x04true'
+    elif obj is False:
+        buffer += b'w\x05false'
+    elif isinstance(obj, str):
+        data = obj.encode()
+        buffer.append(BINARY_EXT)
+        buffer += _uint32.pack(len(data))
+        buffer += data
+    elif isinstance(obj, int):
+        if 0 <= obj < 256:
+            buffer.append(SMALL_INTEGER_EXT)
+            buffer.append(obj)
+        elif -2 ** 31 <= obj < 2 ** 31:
+            buffer.append(INTEGER_EXT)
+            buffer += _int32.pack(obj)
+        else:
+            magnitude = abs(obj)
+            data = magnitude.to_bytes((magnitude.bit_length() + 7) // 8,
+                                      'little')
+            if len(data) < 256:
+                buffer.append(SMALL_BIG_EXT)
+                buffer.append(len(data))
+            else:
+                buffer.append(LARGE_BIG_EXT)
+                buffer += _uint32.pack(len(data))
+            buffer.append(obj < 0)
+            buffer += data
+    elif isinstance(obj, float):
+        buffer.append(NEW_FLOAT_EXT)
+        buffer += _double.pack(obj)
+    elif isinstance(obj, dict):
+        buffer.append(MAP_EXT)
+        buffer += _uint32.pack(len(obj))
+        for key, value in obj.items():
+            _encode(key, buffer)
+            _encode(value, buffer)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        if obj:
+            buffer.append(LIST_EXT)
+            buffer += _uint32.pack(len(obj))
+            for item in obj:
+                _encode(item, buffer)
+        buffer.append(NIL_EXT)
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        buffer.append(BINARY_EXT)
+        buffer += _uint32.pack(len(obj))
+        buffer += obj
+    else:
+        raise TypeError(f'{obj.__class__.__name__} is not ETF serializable')
+
+
+def etf_dumps(obj):
+    """Encodes an object to Erlang External Term Format, str is sent as a
+    binary and None, True and False as the atoms Discord expects"""
+    buffer = bytearray((ETF_VERSION,))
+    _encode(obj, buffer)
+    return bytes(buffer)
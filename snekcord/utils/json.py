@@ -1,6 +1,179 @@
 import json
+import re
 
-__all__ = ('JsonTemplate', 'JsonField', 'JsonArray', 'JsonObject')
+__all__ = ('JsonCodec', 'register_json_codec', 'set_json_codec',
+           'get_json_codec', 'json_loads', 'json_dumps', 'JsonArrayDecoder',
+           'JsonTemplate', 'JsonField', 'JsonArray', 'JsonObject')
+
+
+class JsonCodec:
+    __slots__ = ('name', 'loads', 'dumps')
+
+    def __init__(self, name, loads, dumps):
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(name={self.name!r})'
+
+
+_json_codecs = {}
+_json_codec = None
+
+
+def register_json_codec(name, loads, dumps):
+    """Registers a JSON codec, `loads` must accept bytes or str
+    and `dumps` must return bytes"""
+    codec = _json_codecs[name] = JsonCodec(name, loads, dumps)
+    return codec
+
+
+def set_json_codec(name):
+    global _json_codec
+
+    try:
+        _json_codec = _json_codecs[name]
+    except KeyError:
+        raise ValueError(f'Unknown JSON codec {name!r}') from None
+
+    return _json_codec
+
+
+def get_json_codec():
+    return _json_codec
+
+
+def json_loads(data):
+    return _json_codec.loads(data)
+
+
+def json_dumps(obj):
+    return _json_codec.dumps(obj)
+
+
+_stdlib_encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
+register_json_codec(
+    'json', json.loads, lambda obj: _stdlib_encoder.encode(obj).encode())
+set_json_codec('json')
+
+try:
+    import ujson
+except ImportError:
+    pass
+else:
+    register_json_codec(
+        'ujson', ujson.loads,
+        lambda obj: ujson.dumps(obj, ensure_ascii=False).encode())
+    set_json_codec('ujson')
+
+try:
+    import orjson
+except ImportError:
+    pass
+else:
+    register_json_codec('orjson', orjson.loads, orjson.dumps)
+    set_json_codec('orjson')
+
+
+_STRUCTURAL_PATTERN = re.compile(rb'[\[\]{}",]')
+_STRING_PATTERN = re.compile(rb'["\\]')
+
+
+class JsonArrayDecoder:
+    """Decodes the elements of a JSON array as its bytes arrive,
+    only the element currently being received is kept buffered
+    """
+    __slots__ = ('_buffer', '_position', '_start', '_depth', '_in_string',
+                 'finished')
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+        self._start = None
+        self._depth = 0
+        self._in_string = False
+        self.finished = False
+
+    def _element(self, end):
+        return bytes(self._buffer[self._start:end])
+
+    def feed(self, data):
+        """Adds data to the buffer and returns a list of the
+        elements that were completed by it"""
+        if self.finished:
+            if data.strip():
+                raise ValueError('Data after the end of the array')
+            return []
+
+        buffer = self._buffer
+        buffer += data
+
+        position = self._position
+        elements = []
+
+        while True:
+            if self._in_string:
+                match = _STRING_PATTERN.search(buffer, position)
+                if match is None:
+                    position = len(buffer)
+                    break
+
+                if match.group() == b'\\':
+                    if match.end() >= len(buffer):
+                        # The escaped character hasn't arrived yet
+                        position = match.start()
+                        break
+                    position = match.end() + 1
+                else:
+                    self._in_string = False
+                    position = match.end()
+                continue
+
+            match = _STRUCTURAL_PATTERN.search(buffer, position)
+            if match is None:
+                position = len(buffer)
+                break
+
+            char = match.group()
+            position = match.end()
+
+            if char == b'"':
+                self._in_string = True
+            elif char == b'[' or char == b'{':
+                if self._depth == 0:
+                    if char != b'[':
+                        raise ValueError('Expected a JSON array')
+                    self._start = position
+                self._depth += 1
+            elif char == b']' or char == b'}':
+                self._depth -= 1
+                if self._depth == 0:
+                    # Empty for [], otherwise the last element
+                    element = self._element(match.start())
+                    if element.strip():
+                        elements.append(json_loads(element))
+
+                    self.finished = True
+                    position = len(buffer)
+                    break
+            elif self._depth == 1:
+                elements.append(json_loads(self._element(match.start())))
+                self._start = position
+
+        # Drop everything before the element being received
+        if self._start is not None and not self.finished:
+            del buffer[:self._start]
+            position -= self._start
+            self._start = 0
+        else:
+            buffer.clear()
+            position = 0
+
+        self._position = position
+
+        return elements
 
 
 class JsonTemplate:
@@ -42,7 +215,9 @@ class JsonTemplate:
         return data
 
     def marshal(self, obj, *args, **kwargs):
-        return json.dumps(self.to_dict(obj), *args, **kwargs)
+        if args or kwargs:
+            return json.dumps(self.to_dict(obj), *args, **kwargs)
+        return json_dumps(self.to_dict(obj)).decode()
 
     def default_object(self, name='GenericObject'):
         return JsonObjectMeta(name, (JsonObject,), {},
@@ -133,7 +308,7 @@ class JsonObject(metaclass=JsonObjectMeta):
             raise NotImplementedError
 
         if isinstance(data, (bytes, bytearray, memoryview, str)):
-            data = json.loads(data)
+            data = json_loads(data)
 
         self = cls.__new__(cls)
         cls.__init__(self, *args, **kwargs)
@@ -1,10 +1,14 @@
 import builtins
+import errno
+import os
+import socket
+import stat
 
 from . import undefined
 
-__all__ = ('_validate_keys', 'alist', 'aset', 'aiter', 'anext', 'aenumerate',
-           'afilter', 'amap', 'azip', 'asum', 'asorted', 'amin', 'amax',
-           'aany', 'aall')
+__all__ = ('_validate_keys', '_remove_stale_socket', 'alist', 'aset',
+           'aiter', 'anext', 'aenumerate', 'afilter', 'amap', 'azip', 'asum',
+           'asorted', 'amin', 'amax', 'aany', 'aall')
 
 
 def _validate_keys(name, source, required, keys):
@@ -17,6 +21,28 @@ def _validate_keys(name, source, required, keys):
             raise ValueError(f'{name} received an unexpected key {key!r}')
 
 
+def _remove_stale_socket(path):
+    # Unlinks a Unix socket left behind by a server that is gone,
+    # refuses to touch anything else at the path
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(
+            errno.EEXIST, 'Refusing to replace a non-socket', path)
+
+    with socket.socket(socket.AF_UNIX) as sock:
+        try:
+            sock.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+
+    raise OSError(errno.EADDRINUSE, 'Socket is already being served', path)
+
+
 async def alist(obj):
     values = []
     async for value in obj:
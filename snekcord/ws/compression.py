@@ -0,0 +1,55 @@
+import zlib
+
+__all__ = ('ZLIB_SUFFIX', 'ZlibStreamInflator')
+
+ZLIB_SUFFIX = b'\x00\x00\xff\xff'
+
+
+class ZlibStreamInflator:
+    """Inflates a gateway connection's `zlib-stream` transport compression,
+    every binary frame is fed to the same decompressor and a message
+    is complete once a frame ends with the `Z_SYNC_FLUSH` suffix
+
+    The returned buffer is reused by the next message, it has to be
+    decoded before anything else is fed
+    """
+    __slots__ = ('_decompressor', '_buffer', '_complete', 'bytes_in',
+                 'bytes_out')
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.reset()
+
+    def reset(self):
+        # A new connection starts a new zlib context
+        self._decompressor = zlib.decompressobj()
+        self._buffer.clear()
+        self._complete = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def feed(self, data):
+        """Returns the inflated message if `data` completed one, else None
+        """
+        self.bytes_in += len(data)
+
+        buffer = self._buffer
+        if self._complete:
+            # The last message has been decoded by now
+            buffer.clear()
+            self._complete = False
+
+        chunk = self._decompressor.decompress(data)
+        self.bytes_out += len(chunk)
+
+        if data[-4:] != ZLIB_SUFFIX:
+            buffer += chunk
+            return None
+
+        if not buffer:
+            # The common case, the whole message fit in one frame
+            return chunk
+
+        buffer += chunk
+        self._complete = True
+        return buffer
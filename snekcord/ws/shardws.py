@@ -1,11 +1,17 @@
+import asyncio
+import collections
 import enum
-import json
 import platform
+import random
+import time
+import urllib.parse
 
-from wsaio import WebSocketClient, taskify
+from wsaio import WebSocketClient, WebSocketOpcode, WsaioError, taskify
 
 from .basews import WebSocketResponse
-from ..utils import Snowflake
+from .compression import ZlibStreamInflator
+from ..reststats import RollingHistogram
+from ..utils import Snowflake, etf_dumps, etf_loads, json_dumps
 
 
 class ShardOpcode(enum.IntEnum):
@@ -40,6 +46,14 @@ class ShardCloseCode(enum.IntEnum):
     DISALLOWED_INTENTS = 4014
 
 
+# Closing with 1000 or 1001 invalidates the session, anything
+# else lets the shard resume it on the next connection
+RESUMABLE_CLOSE_CODE = 4000
+
+# How long a zombie connection gets to close before it is abandoned
+ZOMBIE_CLOSE_TIMEOUT = 5.0
+
+
 class Shard(WebSocketClient):
     def __init__(self, sharder, shard_id):
         super().__init__(loop=sharder.loop)
@@ -56,12 +70,141 @@ class Shard(WebSocketClient):
         self.sequence = None
         self._chunk_nonce = -1
 
+        self.ready = False
+        self.close_code = None
+        self.identified = asyncio.Event()
+        self._closed = None
+        self.encoding = sharder.get_encoding(shard_id)
+
+        self.heartbeat_interval = None
+        self.heartbeat_acked = True
+        self.latencies = RollingHistogram()
+        self._latency = None
+        self._heartbeat_task = None
+        # (sent_at, periodic) for every heartbeat awaiting its ACK,
+        # Discord acknowledges them in the order they were sent
+        self._heartbeats = collections.deque()
+        self.inflator = None
+
+    @property
+    def manager(self):
+        return self.sharder.manager
+
+    @property
+    def latency(self):
+        # The round trip time of the last acknowledged heartbeat
+        return self._latency
+
+    async def start(self, url):
+        # Connects and runs until the connection is lost
+        self.ready = False
+        self.close_code = None
+        self.identified.clear()
+        self.heartbeat_acked = True
+        self._heartbeats.clear()
+
+        # Follow the sharder's setting at connect time, the same
+        # way the gateway URL does
+        if not self.sharder.compress:
+            self.inflator = None
+        elif self.inflator is None:
+            self.inflator = ZlibStreamInflator()
+        else:
+            self.inflator.reset()
+
+        # wsaio's protocol state (handshake future, parser, transport)
+        # only lives for one connection, start it over for each one
+        WebSocketClient.__init__(self, self.loop)
+        self._closed = self.loop.create_future()
+
+        kwargs = {}
+
+        port = urllib.parse.urlparse(url).port
+        if port is not None:
+            kwargs['port'] = port
+
+        try:
+            await self.connect(url, **kwargs)
+        except BaseException:
+            if self.transport is not None:
+                self.transport.abort()
+            raise
+
+        try:
+            await self._closed
+        finally:
+            self.stop_heartbeat()
+
+    def connection_made(self, transport):
+        # wsaio requests url.path + url.params, which drops the query
+        # (version, encoding and compression) and is empty for the
+        # bare gateway URL Discord hands out
+        path = self.url.path or '/'
+        if self.url.query:
+            path = f'{path}?{self.url.query}'
+
+        self.url = self.url._replace(path=path, params='')
+        super().connection_made(transport)
+
+    def connection_lost(self, exc):
+        super().connection_lost(exc)
+
+        if self._closed is not None and not self._closed.done():
+            self._closed.set_result(None)
+
+    def start_heartbeat(self, interval):
+        self.stop_heartbeat()
+        self.heartbeat_interval = interval
+        self._heartbeat_task = asyncio.ensure_future(self._heartbeat_loop())
+
+    def stop_heartbeat(self):
+        if self._heartbeat_task is not None:
+            if self._heartbeat_task is not asyncio.current_task():
+                self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+
+    async def _heartbeat_loop(self):
+        # The first heartbeat is jittered so that shards
+        # that connected together don't beat together
+        await asyncio.sleep(self.heartbeat_interval * random.random())
+
+        while True:
+            if not self.heartbeat_acked:
+                # Nothing came back for the last heartbeat, the
+                # connection is dead even if the socket isn't
+                self.sharder.dispatch('shard_zombie', self)
+                await self._close_zombie()
+                return
+
+            try:
+                await self.send_heartbeat(periodic=True)
+            except (OSError, WsaioError):
+                return
+
+            await asyncio.sleep(self.heartbeat_interval)
+
+    async def _close_zombie(self):
+        try:
+            await asyncio.wait_for(self.close(RESUMABLE_CLOSE_CODE),
+                                   ZOMBIE_CLOSE_TIMEOUT)
+        except (asyncio.TimeoutError, OSError, WsaioError):
+            pass
+        finally:
+            # Don't wait on a peer that stopped answering, dropping
+            # the transport resolves start() through connection_lost
+            if not self._closed.done() and self.transport is not None:
+                self.transport.abort()
+
     async def identify(self):
+        # Only so many shards may identify at once, resumes are free
+        await self.sharder.identify_limiter.acquire(self.id)
+
         payload = {
             'op': ShardOpcode.IDENTIFY,
             'd': {
                 'token': self.manager.token,
-                'intents': self.manager.intents,
+                'intents': self.sharder.intents,
+                'shard': [self.id, self.sharder.shard_count],
                 'properties': {
                     '$os': platform.system(),
                     '$browser': 'snekcord',
@@ -69,7 +212,8 @@ class Shard(WebSocketClient):
                 }
             }
         }
-        await self.send_str(json.dumps(payload))
+        await self.send_payload(payload)
+        self.identified.set()
 
     async def resume(self):
         payload = {
@@ -80,14 +224,30 @@ class Shard(WebSocketClient):
                 'seq': self.sequence
             }
         }
-        await self.send_str(json.dumps(payload))
+        await self.send_payload(payload)
+        self.identified.set()
+
+    async def send_payload(self, payload):
+        if self.encoding == 'etf':
+            # wsaio sends TEXT frames unless told otherwise
+            await self.send_bytes(etf_dumps(payload),
+                                  opcode=WebSocketOpcode.BINARY)
+        else:
+            await self.send_str(json_dumps(payload).decode())
 
-    async def send_heartbeat(self):
+    async def send_heartbeat(self, *, periodic=False):
+        # Only the periodic heartbeats count towards latency and zombie
+        # detection, the ones Discord asks for are just answered
         payload = {
             'op': ShardOpcode.HEARTBEAT,
-            'd': None
+            'd': self.sequence
         }
-        await self.send_str(json.dumps(payload))
+
+        if periodic:
+            self.heartbeat_acked = False
+
+        self._heartbeats.append((time.perf_counter(), periodic))
+        await self.send_payload(payload)
 
     async def request_guild_members(self, guild, presences=None, limit=None,
                                     users=None, query=None):
@@ -119,19 +279,38 @@ class Shard(WebSocketClient):
 
         payload['nonce'] = str(self._chunk_nonce)
 
-        await self.send_str(json.dumps(payload))
+        await self.send_payload({
+            'op': ShardOpcode.REQUEST_GUILD_MEMBERS,
+            'd': payload
+        })
 
     @taskify
     async def ws_text_received(self, data):
-        response = WebSocketResponse.unmarshal(data)
+        await self.response_received(WebSocketResponse.unmarshal(data))
+
+    @taskify
+    async def ws_binary_received(self, data):
+        if self.inflator is not None:
+            data = self.inflator.feed(data)
+            if data is None:
+                return
 
+        # The inflator reuses its buffer, so decode before yielding
+        if self.encoding == 'etf':
+            response = WebSocketResponse.unmarshal(etf_loads(data))
+        else:
+            response = WebSocketResponse.unmarshal(data)
+
+        await self.response_received(response)
+
+    async def response_received(self, response):
         try:
             opcode = ShardOpcode(response.opcode)
         except ValueError:
             return
 
-        if (response.sequence is not None
-                and response.sequence > self.sequence):
+        if response.sequence is not None and (
+                self.sequence is None or response.sequence > self.sequence):
             self.sequence = response.sequence
 
         if opcode is ShardOpcode.DISPATCH:
@@ -145,16 +324,47 @@ class Shard(WebSocketClient):
 
                 for guild in data['guilds']:
                     (self.unavailable_guilds if guild['unavailable']
-                     else self.available_guilds).add(guild['id'])
+                     else self.available_guilds).add(Snowflake(guild['id']))
+
+                self.ready = True
+                self.sharder.dispatch('shard_ready', self)
             else:
+                if response.name == 'RESUMED':
+                    self.ready = True
+
                 self.sharder.dispatch(response.name, self, response.data)
         elif opcode is ShardOpcode.HEARTBEAT:
             await self.send_heartbeat()
         elif opcode is ShardOpcode.RECONNECT:
-            return
+            await self.close(code=RESUMABLE_CLOSE_CODE)
         elif opcode is ShardOpcode.INVALID_SESSION:
-            return
+            if not response.data:
+                self.session_id = None
+                self.sequence = None
+
+            await self.close(code=RESUMABLE_CLOSE_CODE)
         elif opcode is ShardOpcode.HELLO:
-            await self.identify()
+            self.start_heartbeat(response.data['heartbeat_interval'] / 1000)
+
+            if self.session_id is not None and self.sequence is not None:
+                await self.resume()
+            else:
+                await self.identify()
         elif opcode is ShardOpcode.HEARTBEAT_ACK:
-            return
+            if not self._heartbeats:
+                return
+
+            sent_at, periodic = self._heartbeats.popleft()
+            if periodic:
+                self.heartbeat_acked = True
+                self._latency = time.perf_counter() - sent_at
+                self.latencies.add(self._latency)
+
+    @taskify
+    async def ws_close_received(self, code, data):
+        self.close_code = code
+
+        try:
+            await self.close(code)
+        except (OSError, WsaioError):
+            pass
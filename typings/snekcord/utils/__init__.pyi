@@ -1,4 +1,5 @@
 from .events import *
+from .etf import *
 from .json import *
 from .misc import *
 from .snowflake import *
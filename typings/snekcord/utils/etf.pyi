@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from typing import Any, Final, Union
+
+ETF_VERSION: Final[int]
+
+
+class EtfError(ValueError):
+    ...
+
+
+def etf_loads(data: Union[bytes, bytearray, memoryview]) -> Any: ...
+
+def etf_dumps(obj: Any) -> bytes: ...
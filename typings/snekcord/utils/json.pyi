@@ -1,6 +1,37 @@
 from __future__ import annotations
 
-from typing import Any, Callable, Final, Optional
+from typing import Any, Callable, Final, Optional, Union
+
+
+class JsonCodec:
+    name: str
+    loads: Callable[[Union[bytes, str]], Any]
+    dumps: Callable[[Any], bytes]
+
+    def __init__(self, name: str,
+                 loads: Callable[[Union[bytes, str]], Any],
+                 dumps: Callable[[Any], bytes]) -> None: ...
+
+
+def register_json_codec(name: str,
+                        loads: Callable[[Union[bytes, str]], Any],
+                        dumps: Callable[[Any], bytes]) -> JsonCodec: ...
+
+def set_json_codec(name: str) -> JsonCodec: ...
+
+def get_json_codec() -> JsonCodec: ...
+
+def json_loads(data: Union[bytes, str]) -> Any: ...
+
+def json_dumps(obj: Any) -> bytes: ...
+
+
+class JsonArrayDecoder:
+    finished: bool
+
+    def __init__(self) -> None: ...
+
+    def feed(self, data: bytes) -> list[Any]: ...
 
 
 class JsonTemplate:
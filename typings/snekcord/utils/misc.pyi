@@ -10,6 +10,9 @@ def _validate_keys(name: str, source: Iterable[str],
                    required: Iterable[str], keys: Iterable[str]) -> None: ...
 
 
+def _remove_stale_socket(path: str) -> None: ...
+
+
 async def alist(obj: AsyncIterable[T]) -> list[T]: ...
 
 